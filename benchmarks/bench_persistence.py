@@ -0,0 +1,103 @@
+'''Benchmark: persistencia de resultados de sondeo, ORM fila a fila contra UPDATE/INSERT masivos
+
+Uso:
+    python benchmarks/bench_persistence.py [--sizes 1000 10000 50000]
+'''
+import os
+import sys
+import time
+import argparse
+import tempfile
+
+from datetime import datetime
+from sqlalchemy import create_engine
+from sqlalchemy.orm import Session
+
+sys.path.append(os.path.dirname(os.path.realpath(__file__)) + '/../')
+from ipmon import db
+from ipmon.database import Hosts, PollHistory, HostAlerts
+from ipmon.persistence import write_poll_results
+from ipmon.icmp import ProbeResult
+from ipmon.targets import ProbeTarget, PollResult
+
+
+def make_database(path, num_hosts):
+    '''Crea una base de datos SQLite con `num_hosts` hosts'''
+    engine = create_engine('sqlite:///{}'.format(path))
+    db.Model.metadata.create_all(engine)
+    with engine.begin() as conn:
+        conn.execute(Hosts.__table__.insert(), [
+            {
+                'ip_address': '10.{}.{}.{}'.format(i >> 16 & 255, i >> 8 & 255, i & 255),
+                'hostname': 'host-{}'.format(i),
+                'status': 'Up',
+                'alerts_enabled': True
+            }
+            for i in range(num_hosts)
+        ])
+    return engine
+
+
+def make_results(engine):
+    '''Genera un ciclo de resultados con un 1% de cambios de estado'''
+    poll_time = datetime.now().replace(microsecond=0)
+    with engine.connect() as conn:
+        rows = conn.execute(Hosts.__table__.select()).mappings().all()
+    return [
+        PollResult(
+            ProbeTarget(row['id'], row['ip_address'], row['hostname'], row['alerts_enabled']),
+            row['status'],
+            'Down' if row['id'] % 100 == 0 else 'Up',
+            poll_time,
+            ProbeResult('Down') if row['id'] % 100 == 0 else ProbeResult('Up', 1.5, 1.2, 1.9, 0.2, 0)
+        )
+        for row in rows
+    ]
+
+
+def persist_orm(session, results):
+    '''Ruta anterior: un SELECT y objetos ORM por host'''
+    for target, previous_status, status, poll_time, dummy, dummy in results:
+        host = session.query(Hosts).filter_by(id=target.id).first()
+        host.previous_status = previous_status
+        host.status = status
+        host.last_poll = poll_time
+        session.add(PollHistory(host_id=target.id, poll_time=poll_time, poll_status=status))
+        if target.alerts_enabled and previous_status != status:
+            session.add(HostAlerts(
+                host_id=target.id,
+                hostname=target.hostname,
+                ip_address=target.ip_address,
+                host_status=status,
+                poll_time=poll_time
+            ))
+    session.commit()
+
+
+def run(num_hosts, persist):
+    '''Devuelve las filas de hosts por segundo escritas por `persist`'''
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = make_database(os.path.join(tmp, 'bench.db'), num_hosts)
+        results = make_results(engine)
+        with Session(engine) as session:
+            s = time.perf_counter()
+            persist(session, results)
+            elapsed = time.perf_counter() - s
+        engine.dispose()
+    return num_hosts / elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--sizes', nargs='+', type=int, default=[1000, 10000, 50000])
+    args = parser.parse_args()
+
+    print('{:>8} {:>14} {:>14} {:>8}'.format('hosts', 'orm rows/s', 'bulk rows/s', 'speedup'))
+    for num_hosts in args.sizes:
+        orm = run(num_hosts, persist_orm)
+        bulk = run(num_hosts, write_poll_results)
+        print('{:>8} {:>14,.0f} {:>14,.0f} {:>7.1f}x'.format(num_hosts, orm, bulk, bulk / orm))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,111 @@
+'''Benchmark: respuesta JSON de la lista de hosts, marshmallow + json.dumps contra ipmon.serialize
+
+Compara por número de hosts:
+    marshmallow   objetos del ORM -> Schemas.hosts().dump -> json.dumps (camino anterior de /hosts)
+    rows+json     filas Core -> serialize.dumps con el json de la biblioteca estándar
+    rows+orjson   filas Core -> serialize.dumps con orjson (si está instalado)
+    live          tabla de estado en memoria -> serialize.dumps, sin caché de versión
+
+Uso:
+    python benchmarks/bench_serialization.py [--hosts 10000 50000] [--repeat 5]
+'''
+import os
+import sys
+import json
+import time
+import argparse
+import tempfile
+
+from datetime import datetime
+from sqlalchemy import create_engine, select
+from sqlalchemy.orm import Session
+
+sys.path.append(os.path.dirname(os.path.realpath(__file__)) + '/../')
+from ipmon import db, serialize
+from ipmon.database import Hosts
+from ipmon.schemas import Schemas, HostsSchema
+from ipmon.status import StatusTable, HOST_FIELDS
+
+
+def make_database(path, num_hosts):
+    '''Crea la base con `num_hosts` hosts ya sondeados'''
+    engine = create_engine('sqlite:///{}'.format(path))
+    db.Model.metadata.create_all(engine)
+    poll_time = datetime.now().replace(microsecond=0)
+    with engine.begin() as conn:
+        conn.execute(Hosts.__table__.insert(), [
+            {
+                'ip_address': '10.{}.{}.{}'.format(i >> 16 & 255, i >> 8 & 255, i & 255),
+                'hostname': 'host-{}'.format(i),
+                'ciudad': 'ciudad-{}'.format(i % 20),
+                'cto': 'cto-{}'.format(i % 500),
+                'dispositivo': 'olt',
+                'tipo': 'fibra',
+                'status': 'Up' if i % 10 else 'Down',
+                'last_poll': poll_time,
+                'previous_status': 'Up',
+                'alerts_enabled': True
+            }
+            for i in range(num_hosts)
+        ])
+    return engine
+
+
+def best(function, repeat):
+    '''Mejor tiempo en ms de `repeat` ejecuciones, y el tamaño de la respuesta'''
+    times = []
+    for dummy in range(repeat):
+        s = time.perf_counter()
+        body = function()
+        times.append(time.perf_counter() - s)
+    return min(times) * 1000, len(body)
+
+
+def run(num_hosts, repeat):
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = make_database(os.path.join(tmp, 'bench.db'), num_hosts)
+        columns = serialize.columns(Hosts, HostsSchema.Meta.fields)
+
+        def marshmallow_path():
+            with Session(engine) as session:
+                return json.dumps(Schemas.hosts(many=True).dump(session.execute(select(Hosts)).scalars().all()))
+
+        def rows_path():
+            with Session(engine) as session:
+                return serialize.dumps(serialize.rows(session.execute(select(*columns))))
+
+        with Session(engine) as session:
+            status = StatusTable()
+            status.load(session.execute(select(*(Hosts.__table__.c[field] for field in HOST_FIELDS))).all())
+
+        def live_path():
+            return serialize.dumps(status.hosts()[0])
+
+        results = [('marshmallow', best(marshmallow_path, repeat))]
+        orjson = serialize.orjson
+        serialize.orjson = None
+        results.append(('rows+json', best(rows_path, repeat)))
+        serialize.orjson = orjson
+        if orjson is not None:
+            results.append(('rows+orjson', best(rows_path, repeat)))
+        results.append(('live', best(live_path, repeat)))
+        engine.dispose()
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--hosts', type=int, nargs='+', default=[10000, 50000])
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    print('{:>8} {:>12} {:>10} {:>10} {:>9}'.format('hosts', 'path', 'ms', 'speedup', 'KiB'))
+    for num_hosts in args.hosts:
+        results = run(num_hosts, args.repeat)
+        baseline = results[0][1][0]
+        for name, (ms, size) in results:
+            print('{:>8,} {:>12} {:>10.1f} {:>9.1f}x {:>9,.0f}'.format(num_hosts, name, ms, baseline / ms, size / 1024))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,182 @@
+'''Benchmark: lecturas concurrentes mientras el escritor guarda ciclos de sondeo, SQLite por defecto contra WAL + PRAGMAs
+
+Cada lector y el escritor corren en su propio proceso, como varios workers web frente al poller.
+Lectores y escritor van a un ritmo fijo, como las peticiones web y los ciclos de sondeo, para que la
+latencia mida las esperas por bloqueos de la base y no el reparto de CPU entre procesos; sin ritmo,
+en una máquina con pocos núcleos ambos motores solo miden el tiempo de CPU de Python. Con discos de
+fsync rápido (~1 ms por commit) los bloqueos duran poco frente a los ~100 ms de CPU por lote y ambos
+motores rinden igual; la diferencia aparece con fsync lento o más escritura por segundo.
+
+Uso:
+    python benchmarks/bench_sqlite_concurrency.py [--hosts 5000] [--readers 4] [--read-rate 50]
+        [--write-rate 2000] [--seconds 10] [--dir DIR]
+'''
+import os
+import sys
+import time
+import argparse
+import tempfile
+import multiprocessing
+
+from datetime import datetime
+from sqlalchemy import create_engine, select, func
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.orm import Session
+
+sys.path.append(os.path.dirname(os.path.realpath(__file__)) + '/../')
+from ipmon import db, config
+from ipmon.database import Hosts, PollHistory
+from ipmon.engine import engine_options, apply_pragmas
+from ipmon.persistence import write_poll_results
+from ipmon.icmp import ProbeResult
+from ipmon.targets import ProbeTarget, PollResult
+
+_hosts = Hosts.__table__
+_poll_history = PollHistory.__table__
+
+
+def make_engine(path, tuned):
+    '''Motor por defecto de SQLAlchemy o el configurado con config['SQLite']'''
+    if not tuned:
+        return create_engine('sqlite:///{}'.format(path))
+    engine = create_engine('sqlite:///{}'.format(path), **engine_options(config['SQLite']))
+    apply_pragmas(engine, config['SQLite'])
+    return engine
+
+
+def make_database(path, num_hosts):
+    '''Crea la base con `num_hosts` hosts y un ciclo de historial'''
+    engine = create_engine('sqlite:///{}'.format(path))
+    db.Model.metadata.create_all(engine)
+    with engine.begin() as conn:
+        conn.execute(_hosts.insert(), [
+            {
+                'ip_address': '10.{}.{}.{}'.format(i >> 16 & 255, i >> 8 & 255, i & 255),
+                'hostname': 'host-{}'.format(i),
+                'status': 'Up',
+                'alerts_enabled': False
+            }
+            for i in range(num_hosts)
+        ])
+        targets = [ProbeTarget(*row) for row in conn.execute(
+            select(_hosts.c.id, _hosts.c.ip_address, _hosts.c.hostname, _hosts.c.alerts_enabled)
+        )]
+    engine.dispose()
+    return targets
+
+
+def _pace(start, count, rate):
+    '''Espera hasta que toque la operación `count` a `rate` por segundo desde `start`'''
+    delay = start + count / rate - time.perf_counter()
+    if delay > 0:
+        time.sleep(delay)
+
+
+def writer(path, tuned, targets, rate, stop, written, write_time):
+    '''Escribe ciclos completos en lotes de 500 a `rate` filas por segundo, como el hilo escritor'''
+    engine = make_engine(path, tuned)
+    start = time.perf_counter()
+    count = 0
+    with Session(engine) as session:
+        while not stop.is_set():
+            poll_time = datetime.now().replace(microsecond=0)
+            for i in range(0, len(targets), 500):
+                _pace(start, count, rate)
+                if stop.is_set():
+                    break
+                results = [
+                    PollResult(target, 'Up', 'Up', poll_time, ProbeResult('Up', 1.5, 1.2, 1.9, 0.2, 0))
+                    for target in targets[i:i + 500]
+                ]
+                s = time.perf_counter()
+                try:
+                    write_poll_results(session, results)
+                    written.value += len(results)
+                except OperationalError:
+                    session.rollback()
+                write_time.value += time.perf_counter() - s
+                count += len(results)
+    engine.dispose()
+
+
+def reader(path, tuned, num_hosts, rate, stop, latencies):
+    '''Consultas de la web a `rate` por segundo: conteo por estado y una página del historial de un host'''
+    engine = make_engine(path, tuned)
+    samples = []
+    host_id = 0
+    start = time.perf_counter()
+    while not stop.is_set():
+        _pace(start, len(samples), rate)
+        host_id = host_id % num_hosts + 1
+        s = time.perf_counter()
+        try:
+            with engine.connect() as conn:
+                conn.execute(select(func.count()).select_from(_hosts).where(_hosts.c.status == 'Up')).scalar()
+                conn.execute(
+                    select(_poll_history).where(_poll_history.c.host_id == host_id)
+                    .order_by(_poll_history.c.poll_time.desc()).limit(100)
+                ).all()
+        except OperationalError:
+            samples.append(None)
+            continue
+        samples.append(time.perf_counter() - s)
+    latencies.put(samples)
+    engine.dispose()
+
+
+def run(directory, num_hosts, num_readers, read_rate, write_rate, seconds, tuned):
+    '''Devuelve lecturas/s, latencia p50/p99/máx en ms, filas escritas/s, ms por lote escrito y lecturas fallidas'''
+    with tempfile.TemporaryDirectory(dir=directory) as tmp:
+        path = os.path.join(tmp, 'bench.db')
+        targets = make_database(path, num_hosts)
+        stop = multiprocessing.Event()
+        written = multiprocessing.Value('q', 0)
+        write_time = multiprocessing.Value('d', 0.0)
+        latencies = multiprocessing.Queue()
+        processes = [multiprocessing.Process(target=writer, args=(path, tuned, targets, write_rate, stop, written, write_time))]
+        processes += [
+            multiprocessing.Process(target=reader, args=(path, tuned, num_hosts, read_rate, stop, latencies))
+            for dummy in range(num_readers)
+        ]
+        for process in processes:
+            process.start()
+        time.sleep(seconds)
+        stop.set()
+        samples = [sample for dummy in range(num_readers) for sample in latencies.get()]
+        for process in processes:
+            process.join()
+
+    failed = samples.count(None)
+    samples = sorted(sample for sample in samples if sample is not None) or [0.0]
+    return (
+        len(samples) / seconds,
+        samples[len(samples) // 2] * 1000,
+        samples[int(len(samples) * 0.99)] * 1000,
+        samples[-1] * 1000,
+        written.value / seconds,
+        write_time.value / max(written.value / 500, 1) * 1000,
+        failed
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--hosts', type=int, default=5000)
+    parser.add_argument('--readers', type=int, default=4)
+    parser.add_argument('--read-rate', type=float, default=50, help='Reads per second per reader')
+    parser.add_argument('--write-rate', type=float, default=2000, help='Rows written per second')
+    parser.add_argument('--seconds', type=float, default=10)
+    parser.add_argument('--dir', help='Directory for the test database; use the disk that will hold ipmon.db')
+    args = parser.parse_args()
+
+    print('{:>8} {:>10} {:>9} {:>9} {:>9} {:>15} {:>9} {:>7}'.format(
+        'engine', 'reads/s', 'p50 ms', 'p99 ms', 'max ms', 'rows written/s', 'ms/batch', 'failed'
+    ))
+    for name, tuned in (('default', False), ('tuned', True)):
+        print('{:>8} {:>10,.0f} {:>9.2f} {:>9.2f} {:>9.2f} {:>15,.0f} {:>9.2f} {:>7}'.format(
+            name, *run(args.dir, args.hosts, args.readers, args.read_rate, args.write_rate, args.seconds, tuned)
+        ))
+
+
+if __name__ == '__main__':
+    main()
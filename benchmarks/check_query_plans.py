@@ -0,0 +1,105 @@
+'''Comprueba con EXPLAIN QUERY PLAN que las consultas más frecuentes usan índices
+
+Uso:
+    python benchmarks/check_query_plans.py [--database ipmon/database/ipmon.db]
+
+Sin --database crea una base temporal con el esquema actual. Sale con código 1 si alguna
+consulta recorre la tabla completa en lugar de usar el índice esperado.
+'''
+import os
+import sys
+import argparse
+import tempfile
+
+from datetime import datetime, date
+from sqlalchemy import create_engine, select, func, text
+
+sys.path.append(os.path.dirname(os.path.realpath(__file__)) + '/../')
+from ipmon import db
+from ipmon.database import Hosts, PollHistory, HostAlerts, HostStatusIntervals
+
+_poll_history = PollHistory.__table__
+_alerts = HostAlerts.__table__
+_hosts = Hosts.__table__
+_intervals = HostStatusIntervals.__table__
+
+# (description, statement, expected index)
+HOT_QUERIES = [
+    (
+        '/pollHistory/<host_id>',
+        select(_poll_history).where(_poll_history.c.host_id == 1).order_by(_poll_history.c.poll_time),
+        'ix_pollHistory_host_id_poll_time'
+    ),
+    (
+        '/availability/<host_id>',
+        select(func.count()).select_from(_poll_history).where(
+            _poll_history.c.host_id == 1, _poll_history.c.poll_time >= datetime(2026, 1, 1)
+        ),
+        'ix_pollHistory_host_id_poll_time'
+    ),
+    (
+        'delete_host: poll history',
+        _poll_history.delete().where(_poll_history.c.host_id == 1),
+        'ix_pollHistory_host_id_poll_time'
+    ),
+    (
+        'retention: poll history',
+        select(_poll_history.c.id).where(_poll_history.c.date_created < date(2026, 1, 1)).limit(5000),
+        'ix_pollHistory_date_created'
+    ),
+    (
+        '/hostAlerts/new',
+        select(_alerts).where(_alerts.c.alert_cleared == False),  # noqa: E712
+        'ix_hostAlerts_alert_cleared_host_id'
+    ),
+    (
+        'delete_host: alerts',
+        _alerts.delete().where(_alerts.c.host_id == 1),
+        'ix_hostAlerts_host_id_poll_time'
+    ),
+    (
+        '/hostCounts',
+        select(func.count()).select_from(_hosts).where(_hosts.c.status == 'Up'),
+        'ix_hosts_status'
+    ),
+    (
+        'retention: status intervals',
+        select(_intervals.c.id).where(_intervals.c.end_time < '2026-01-01').limit(5000),
+        'ix_hostStatusIntervals_end_time'
+    )
+]
+
+
+def explain(conn, statement):
+    '''Devuelve las líneas de EXPLAIN QUERY PLAN de una sentencia'''
+    sql = str(statement.compile(conn, compile_kwargs={'literal_binds': True}))
+    return [row[-1] for row in conn.execute(text('EXPLAIN QUERY PLAN ' + sql))]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--database', help='SQLite database to check instead of a fresh schema')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = args.database or os.path.join(tmp, 'plans.db')
+        engine = create_engine('sqlite:///{}'.format(path))
+        if not args.database:
+            db.Model.metadata.create_all(engine)
+
+        failures = 0
+        with engine.connect() as conn:
+            for description, statement, index in HOT_QUERIES:
+                plan = explain(conn, statement)
+                ok = any(index in line for line in plan)
+                failures += not ok
+                print('{} {}'.format('OK  ' if ok else 'FAIL', description))
+                for line in plan:
+                    print('       {}'.format(line))
+        engine.dispose()
+
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == '__main__':
+    main()
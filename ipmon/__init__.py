@@ -12,6 +12,8 @@ from flask import Flask, render_template
 from flask_migrate import Migrate
 from apscheduler.schedulers.background import BackgroundScheduler
 
+from ipmon.engine import engine_options, apply_pragmas
+
 
 config = {
     'Database_Path': os.path.join(
@@ -31,7 +33,89 @@ config = {
         'Uppercase': 1,
         'Nonletters': 2
     },
-    'Max_Threads': 100
+    'Max_Threads': 100,
+    'Ping_Backend': 'auto',
+    'Max_Concurrent_Probes': 1000,
+    'Write_Buffer': {
+        'Max_Queued': 50000,
+        'Batch_Size': 500,
+        'Flush_Interval': 1.0
+    },
+    'Target_Cache_TTL': 300,
+    'History_Mode': 'polls',
+    'Interval_Flush_Window': 300,
+    'History_Query': {
+        'Page_Size': 500,
+        'Max_Page_Size': 5000,
+        'Max_Buckets': 1000
+    },
+    'Retention': {
+        'Chunk_Size': 5000,
+        'Chunk_Pause': 0.05
+    },
+    'Archive': {
+        'Enabled': True,
+        'Path': os.path.join(
+            os.path.dirname(os.path.realpath(__file__)),
+            'database',
+            'archive'
+        ),
+        'Retention_Days': 365,
+        'Chunk_Rows': 65536,
+        'Compression_Level': 6
+    },
+    'Rollup_Retention_Days': {
+        'Hourly': 90,
+        'Daily': 730
+    },
+    'Adaptive_Polling': {
+        'Enabled': True,
+        'Tick': 5,
+        'Min_Interval': 10,
+        'Max_Backoff': 4,
+        'Stable_Polls': 5
+    },
+    'Probe_Strategy': {
+        'Fast_Fail': True,
+        'Count': 3,
+        'Min_Timeout': 0.2,
+        'Max_Timeout': 1.0
+    },
+    'Settings_Cache': {
+        'Check_Interval': 2.0
+    },
+    'Poller': {
+        'Embedded': False,
+        'Status_Refresh': 2.0,
+        # The web app serves /writerMetrics and /pushMetrics from this file
+        'Metrics_Path': os.path.join(
+            os.path.dirname(os.path.realpath(__file__)),
+            'database',
+            'poller_metrics.json'
+        ),
+        'Metrics_Interval': 10
+    },
+    'Push': {
+        'Enabled': True,
+        # Serve it to browsers through the web app's reverse proxy; see README
+        'Host': '127.0.0.1',
+        'Port': 5001,
+        # URL browsers open, e.g. '/events' behind the proxy; None for //<web host>:<Port>/events, or no
+        # push at all while Host is a loopback address
+        'Public_URL': None,
+        # Origins allowed to read the channel when browsers reach Port directly
+        'Allowed_Origins': [],
+        'Token_Max_Age': 86400,
+        'Queue_Size': 256,
+        'Heartbeat': 15,
+        'Max_Clients': 1000
+    },
+    # Cache, mmap and pool sizes stay at the SQLite/SQLAlchemy defaults; see benchmarks/bench_sqlite_concurrency.py
+    'SQLite': {
+        'Journal_Mode': 'WAL',
+        'Synchronous': 'NORMAL',
+        'Busy_Timeout': 5000
+    }
 }
 
 # Web App
@@ -39,17 +123,19 @@ app = Flask(__name__)
 app.secret_key = str(uuid.UUID(int=uuid.getnode()))
 app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
 app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///{}'.format(config['Database_Path'])
+app.config['SQLALCHEMY_ENGINE_OPTIONS'] = engine_options(config['SQLite'])
 
 # Database
 db = SQLAlchemy()
 db.init_app(app)
+with app.app_context():
+    apply_pragmas(db.engine, config['SQLite'])
 
 # Database Migration
 migrate = Migrate(app, db)
 
-# Scheduler
+# Scheduler; started only by the poller process (ipmon-poller), see ipmon/poller.py
 scheduler = BackgroundScheduler()
-scheduler.start()
 
 # Authentication Manager
 login_manager = flask_login.LoginManager()
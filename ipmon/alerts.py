@@ -1,16 +1,15 @@
 '''Modulo Alertas'''
 import os
 import sys
-import json
 
 from multiprocessing.pool import ThreadPool
 
 sys.path.append(os.path.dirname(os.path.realpath(__file__)) + '/../')
 from ipmon import db, scheduler, app, config, log
-from ipmon.database import Users, Hosts, HostAlerts
-from ipmon.schemas import Schemas
-from ipmon.api import get_alerts_enabled, get_smtp_configured
+from ipmon.database import Hosts, HostAlerts
+from ipmon.services import get_alerts_enabled, get_alert_recipients, smtp_configured
 from ipmon.smtp import send_smtp_message
+from ipmon.writer import result_writer
 
 
 def update_host_status_alert_schedule(alert_interval):
@@ -26,14 +25,16 @@ def update_host_status_alert_schedule(alert_interval):
 
 def _host_status_alerts_threaded():
     with app.app_context():
-        alerts_enabled = json.loads(get_alerts_enabled())['alerts_enabled']
-        smtp_configured = json.loads(get_smtp_configured())['smtp_configured']
+        alerts_enabled = get_alerts_enabled()
+        smtp_ready = smtp_configured()
         alerts = HostAlerts.query.filter_by(alert_cleared=False).all()
+        if not alerts:
+            return
 
-        for alert in alerts:
-            alert.alert_cleared = True
+        # Clear through the single DB writer so this job never holds the write lock while sending mail
+        result_writer.submit(_clear_host_alerts, [alert.id for alert in alerts]).result()
 
-        if smtp_configured and alerts_enabled:
+        if smtp_ready and alerts_enabled:
             pool = ThreadPool(config['Max_Threads'])
             threads = []
 
@@ -50,7 +51,7 @@ def _host_status_alerts_threaded():
                 message += thread.get()
 
             if message:
-                recipients = ';'.join(x['email'] for x in Schemas.users(many=True).dump(Users.query.filter_by(alerts_enabled=True)))
+                recipients = ';'.join(get_alert_recipients())
                 try:
                     send_smtp_message(
                         recipient=recipients,
@@ -60,7 +61,10 @@ def _host_status_alerts_threaded():
                 except Exception as exc:
                     log.error('Failed to send host status change alert email: {}'.format(exc))
 
-        db.session.commit()
+
+def _clear_host_alerts(alert_ids):
+    HostAlerts.query.filter(HostAlerts.id.in_(alert_ids)).update({'alert_cleared': True}, synchronize_session=False)
+    db.session.commit()
 
 
 def _get_alert_status_message(alert):
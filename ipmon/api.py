@@ -2,112 +2,310 @@
 import os
 import sys
 import flask_login
-import json
 
-from flask import Blueprint
+from datetime import datetime, date, timedelta
+from flask import Blueprint, request, Response
+from sqlalchemy import select
 
 sys.path.append(os.path.dirname(os.path.realpath(__file__)) + '/../')
-from ipmon import db
-from ipmon.database import Hosts, Polling, PollHistory, WebThemes, Users, SmtpServer, HostAlerts
-from ipmon.schemas import Schemas
+from ipmon import db, config
+from ipmon import services
+from ipmon.database import Hosts, PollHistory, HostAlerts, HostStatusIntervals, HostRollupsHourly, HostRollupsDaily, \
+    RetentionRuns, DeletedHosts
+from ipmon.archive import purge_archive
+from ipmon.history import get_host_history, get_history_buckets, get_availability, get_rollups, TIME_FORMAT
+from ipmon.schemas import HostsSchema, HostAlertsSchema, RetentionRunsSchema
+from ipmon.serialize import json_response, columns, rows, first_row, MIMETYPE
+from ipmon.status import live_status, HOST_FIELDS, FILTER_FIELDS, GROUP_FIELDS
+from ipmon.targets import probe_targets
+from ipmon.poller import get_metrics
 
 api = Blueprint('api', __name__)
 
 #####################
 # API Routes ########
 #####################
+def _live_status():
+    '''Live status table, loading it from the database only on first use or after host edits'''
+    probe_targets.get()
+    return live_status
+
+
+def _asdict(record):
+    '''Service record as a dict; missing records serialize as {} like marshmallow did'''
+    return {} if record is None else record._asdict()
+
+
+def _not_modified(etag):
+    '''304 response when the client already has `etag`, otherwise None'''
+    if request.if_none_match.contains(etag):
+        response = Response(status=304)
+        response.set_etag(etag)
+        return response
+    return None
+
+
 @api.route('/hosts', methods=['GET'])
 def get_all_hosts():
-    '''Get all hosts'''
-    return json.dumps(Schemas.hosts(many=True).dump(Hosts.query.all()))
+    '''Get all hosts from the live status table; honours If-None-Match with the table version as ETag'''
+    status = _live_status()
+    not_modified = _not_modified(str(status.version))
+    if not_modified is not None:
+        return not_modified
+
+    data, version = status.hosts_json()
+    response = Response(data, headers={'X-Status-Version': str(version)}, mimetype=MIMETYPE)
+    response.set_etag(str(version))
+    return response
+
 
+@api.route('/hosts/changes', methods=['GET'])
+def get_host_changes():
+    '''Get hosts whose state changed after the `since` version'''
+    return json_response(_live_status().changes(request.args.get('since', 0, type=int)))
 
-@api.route('/hosts/<id>', methods=['GET'])
-def get_host(_id):
+
+@api.route('/hosts/<int:host_id>', methods=['GET'])
+def get_host(host_id):
     '''Get host by ID'''
-    return json.dumps(Schemas.hosts(many=False).dump(Hosts.query.filter_by(id=_id).first()))
+    return json_response(first_row(db.session.execute(
+        select(*columns(Hosts, HostsSchema.Meta.fields)).where(Hosts.id == host_id)
+    )))
 
 
 @api.route('/hostsDataTable', methods=['GET'])
 def get_all_hosts_datatable():
-    '''Get all hosts'''
-    data = {
-        "columns": [
-            { "data": "hostname", "title": "Hostname" },
-            { "data": "ip_address", "title": "IP Address" },
-            { "data": "last_poll", "title": "Last Poll" },
-            { "data": "status", "title": "Status" }
-        ],
-        "data": Schemas.hosts(many=True).dump(Hosts.query.all())
-    }
-    return json.dumps(data)
+    '''Get hosts from the live status table; implements DataTables server-side processing when `draw` is sent'''
+    if 'draw' not in request.args:
+        hosts, version = _live_status().hosts()
+        data = {
+            "version": version,
+            "columns": [
+                { "data": "hostname", "title": "Hostname" },
+                { "data": "ip_address", "title": "IP Address" },
+                { "data": "last_poll", "title": "Last Poll" },
+                { "data": "status", "title": "Status" }
+            ],
+            "data": hosts
+        }
+        return json_response(data)
+
+    args = request.args
+    # Filters come from column searches (columns[i][search][value]) or plain query parameters
+    filters = {}
+    i = 0
+    while 'columns[{}][data]'.format(i) in args:
+        field = args.get('columns[{}][data]'.format(i))
+        value = args.get('columns[{}][search][value]'.format(i), '')
+        if field in FILTER_FIELDS and value:
+            filters[field] = value
+        i += 1
+    for field in FILTER_FIELDS:
+        if args.get(field):
+            filters[field] = args.get(field)
+
+    order = args.get('columns[{}][data]'.format(args.get('order[0][column]', -1, type=int)))
+    length = args.get('length', 10, type=int)
+    page = _live_status().page(
+        start=max(args.get('start', 0, type=int), 0),
+        length=None if length < 0 else length,
+        search=args.get('search[value]', ''),
+        order=order if order in HOST_FIELDS else None,
+        descending=args.get('order[0][dir]') == 'desc',
+        filters=filters
+    )
+    return json_response({
+        "draw": args.get('draw', 0, type=int),
+        "recordsTotal": page['total'],
+        "recordsFiltered": page['filtered'],
+        "version": page['version'],
+        "data": page['data']
+    })
 
 @api.route('/hostAlerts', methods=['GET'])
 def get_all_host_alerts():
     '''Get all host alerts'''
-    return json.dumps(Schemas.host_alerts(many=True).dump(HostAlerts.query.join(Hosts).all()))
+    return json_response(rows(db.session.execute(
+        select(*columns(HostAlerts, HostAlertsSchema.Meta.fields)).join(Hosts, HostAlerts.host_id == Hosts.id)
+    )))
 
 
 @api.route('/hostAlerts/new', methods=['GET'])
 def get_new_host_alerts():
     '''Get new host alerts'''
-    return json.dumps(Schemas.host_alerts(many=True).dump(HostAlerts.query.filter_by(alert_cleared=False)))
+    return json_response(rows(db.session.execute(
+        select(*columns(HostAlerts, HostAlertsSchema.Meta.fields)).where(HostAlerts.alert_cleared.is_(False))
+    )))
 
 
 @api.route('/pollingConfig', methods=['GET'])
 def get_polling_config():
     '''Get polling config'''
-    return json.dumps(Schemas.polling_config().dump(Polling.query.filter_by(id=1).first()))
+    return json_response(_asdict(services.get_polling_config()))
+
 
+def _bad_request(message):
+    '''JSON 400 response; abort() would render the HTML error page'''
+    return json_response({'error': message}, status=400)
 
-@api.route('/pollHistory/<host_id>', methods=['GET'])
+
+def _time_arg(name):
+    '''Parse an ISO date or datetime query argument; raises ValueError naming the argument'''
+    value = request.args.get(name)
+    if not value:
+        return None
+    try:
+        return datetime.fromisoformat(value)
+    except ValueError:
+        raise ValueError('Invalid {} time: {}'.format(name, value))
+
+
+@api.route('/pollHistory/<int:host_id>', methods=['GET'])
 def get_poll_history(host_id):
-    '''Get poll history for a single host'''
-    return json.dumps(Schemas.poll_history(many=True).dump(PollHistory.query.filter_by(host_id=host_id)))
+    '''Get poll history for a single host between `from` and `to`, newest first in pages of `limit` rows
+
+    Pass the returned `next_cursor` as `cursor` for the next page. With `resolution` (seconds) the
+    range is returned as aggregated buckets instead of raw polls.
+    '''
+    try:
+        start = _time_arg('from')
+        end = _time_arg('to')
+        cursor = _time_arg('cursor')
+    except ValueError as exc:
+        return _bad_request(str(exc))
+    resolution = request.args.get('resolution', type=int)
+    if resolution:
+        end = end or datetime.now()
+        start = start or end - timedelta(days=1)
+        resolution, buckets = get_history_buckets(host_id, start, end, resolution)
+        return json_response({
+            'host_id': host_id,
+            'from': start.strftime(TIME_FORMAT),
+            'to': end.strftime(TIME_FORMAT),
+            'resolution': resolution,
+            'data': buckets
+        })
+
+    limit = request.args.get('limit', config['History_Query']['Page_Size'], type=int)
+    history, cursor = get_host_history(
+        host_id, start, end, cursor, min(max(limit, 1), config['History_Query']['Max_Page_Size'])
+    )
+    return json_response({'host_id': host_id, 'next_cursor': cursor, 'data': history})
+
+
+@api.route('/availability/<int:host_id>', methods=['GET'])
+def get_host_availability(host_id):
+    '''Get the fraction of time a host was up over the last `hours` (default 24)'''
+    now = datetime.now()
+    since = now - timedelta(hours=request.args.get('hours', 24, type=float))
+    return json_response({
+        'host_id': host_id,
+        'since': since.strftime(TIME_FORMAT),
+        'availability': get_availability(host_id, since, now)
+    })
 
-# TODO Should check this by user id
 @api.route('/alertsEnabled', methods=['GET'])
 def get_alerts_enabled():
     '''Get whether alerts are enabled or not'''
-    status = Schemas.users(many=False).dump(Users.query.first())['alerts_enabled']
-    return json.dumps({'alerts_enabled': status})
+    return json_response({'alerts_enabled': services.get_alerts_enabled()})
 
 
 @api.route('/smtpConfigured', methods=['GET'])
 def get_smtp_configured():
     '''Get whether SMTP configured or not'''
-    config = json.loads(get_smtp_config())
-    if config['smtp_server'] and config['smtp_port'] and config['smtp_sender']:
-        return json.dumps({'smtp_configured': True})
-    return json.dumps({'smtp_configured': False})
+    return json_response({'smtp_configured': services.smtp_configured()})
 
 
 @api.route('/smtpConfig', methods=['GET'])
 def get_smtp_config():
     '''Get SMTP config'''
-    return json.dumps(Schemas.smtp_config().dump(SmtpServer.query.first()))
+    return json_response(_asdict(services.get_smtp_config()))
 
 
 @api.route('/webThemes', methods=['GET'])
 def get_web_themes():
     '''Get all web themese'''
-    return json.dumps(Schemas.web_themes(many=True).dump(WebThemes.query.all()))
+    return json_response([theme._asdict() for theme in services.get_web_themes()])
 
 
 @api.route('/webThemes/active', methods=['GET'])
 def get_active_theme():
     '''Get active theme'''
-    return json.dumps(Schemas.web_themes(many=False).dump(WebThemes.query.filter_by(active=True).first()))
+    return json_response(_asdict(services.get_active_theme()))
 
 
 @api.route('/hostCounts', methods=['GET'])
 def get_host_counts():
-    '''Get host total, available, unavailable host counts'''
-    total = Hosts.query.count()
-    num_up = Hosts.query.filter(Hosts.status == 'Up').count()
-    num_down = Hosts.query.filter(Hosts.status == 'Down').count()
+    '''Get host total, available, unavailable host counts from the poller-maintained counters'''
+    status = _live_status()
+    etag = str(status.state_version)
+    not_modified = _not_modified(etag)
+    if not_modified is not None:
+        return not_modified
+
+    total, counts, version = status.counts()
+    response = json_response({
+        'total_hosts': total,
+        'available_hosts': counts.get('Up', 0),
+        'unavailable_hosts': counts.get('Down', 0),
+        'version': version
+    })
+    response.set_etag(etag)
+    return response
+
+
+@api.route('/hostCounts/groups', methods=['GET'])
+def get_host_group_counts():
+    '''Get Up/Down host counts grouped by ciudad, cto, dispositivo and tipo, or only the `by` fields'''
+    status = _live_status()
+    fields = tuple(field for field in request.args.get('by', ','.join(GROUP_FIELDS)).split(',') if field)
+    if not fields or any(field not in GROUP_FIELDS for field in fields):
+        return _bad_request('Invalid group fields: {}'.format(request.args.get('by')))
+    etag = '{}-{}'.format(status.state_version, '-'.join(fields))
+    not_modified = _not_modified(etag)
+    if not_modified is not None:
+        return not_modified
+
+    groups, version = status.group_counts(fields)
+    response = json_response({'version': version, 'groups': groups})
+    response.set_etag(etag)
+    return response
+
+
+@api.route('/rollups/<int:host_id>', methods=['GET'])
+def get_host_rollups(host_id):
+    '''Get hourly or daily poll aggregates for a host over the last `days` (default 7)'''
+    period = request.args.get('period', 'hourly')
+    since = datetime.now() - timedelta(days=request.args.get('days', 7, type=float))
+    return json_response(get_rollups(host_id, period, since))
+
+
+def _poller_metrics(name):
+    '''Metrics published by the poller process, or 503 until it has published them'''
+    metrics = get_metrics(name)
+    if metrics is None:
+        return json_response({'error': 'Poller metrics not available'}, status=503)
+    return json_response(metrics)
+
+
+@api.route('/writerMetrics', methods=['GET'])
+def get_writer_metrics():
+    '''Get poll result write buffer metrics of the poller process'''
+    return _poller_metrics('writer')
+
+
+@api.route('/pushMetrics', methods=['GET'])
+def get_push_metrics():
+    '''Get push channel client metrics of the poller process'''
+    return _poller_metrics('push')
+
 
-    return json.dumps({'total_hosts': total, 'available_hosts': num_up, 'unavailable_hosts': num_down})
+@api.route('/retentionRuns', methods=['GET'])
+def get_retention_runs():
+    '''Get the last 30 poll history cleanup runs'''
+    return json_response(rows(db.session.execute(
+        select(*columns(RetentionRuns, RetentionRunsSchema.Meta.fields)).order_by(RetentionRuns.id.desc()).limit(30)
+    )))
 
 
 @api.route('/hosts/all', methods=['DELETE'])
@@ -116,7 +314,15 @@ def delete_all_hosts():
     Hosts.query.delete()
     HostAlerts.query.delete()
     PollHistory.query.delete()
+    HostStatusIntervals.query.delete()
+    HostRollupsHourly.query.delete()
+    HostRollupsDaily.query.delete()
+    # The whole archive is purged below
+    DeletedHosts.query.delete()
 
     db.session.commit()
+    probe_targets.invalidate()
+    # Host ids start over once the table is empty; archived history would attach to new hosts
+    purge_archive(date.max)
 
-    return json.dumps({'status': 'success'})
+    return json_response({'status': 'success'})
@@ -0,0 +1,305 @@
+'''Archivo columnar comprimido del historial de sondeo, un archivo por día leído con mmap
+
+Formato de cada archivo (little-endian):
+
+    [bloques zlib de cada columna, de `chunk_rows` filas cada uno]
+    [directorio de hosts: host_id, fila inicial, número de filas ('<III' por host, ordenado)]
+    [directorio de bloques: desplazamiento, longitud ('<QI' por bloque y columna)]
+    [pie: _FOOTER]
+
+Las filas están ordenadas por (host_id, poll_time), así que leer un host solo descomprime los
+bloques que cubren su rango de filas.
+'''
+import os
+import re
+import sys
+import mmap
+import zlib
+import array
+import bisect
+import struct
+
+from datetime import datetime, timedelta
+from sqlalchemy import select
+
+sys.path.append(os.path.dirname(os.path.realpath(__file__)) + '/../')
+from ipmon import config
+from ipmon.database import PollHistory
+
+_MAGIC = b'IPMA'
+_VERSION = 1
+# magic, version, rows, hosts, chunk rows, chunks, host directory offset, chunk directory offset
+_FOOTER = struct.Struct('<4sHIIIIQQ')
+_HOST_ENTRY = struct.Struct('<III')
+_CHUNK_ENTRY = struct.Struct('<QI')
+
+# (column, array typecode); RTT columns use -1 and loss_pct 255 for NULL
+COLUMNS = (
+    ('offset', 'I'),
+    ('status', 'B'),
+    ('rtt_min_us', 'i'),
+    ('rtt_avg_us', 'i'),
+    ('rtt_max_us', 'i'),
+    ('jitter_us', 'i'),
+    ('loss_pct', 'B')
+)
+_NULLS = {'rtt_min_us': -1, 'rtt_avg_us': -1, 'rtt_max_us': -1, 'jitter_us': -1, 'loss_pct': 255}
+_STATUS = ('Down', 'Up')
+_FILE_NAME = re.compile(r'^pollHistory-(\d{4}-\d{2}-\d{2})\.ipa$')
+
+_poll_history = PollHistory.__table__
+# (archive directory, its mtime, days); adding or removing a file changes the mtime, also when
+# another process (the poller) does it
+_days_cache = (None, None, ())
+
+
+def archive_path(day):
+    '''Ruta del archivo de un día'''
+    return os.path.join(config['Archive']['Path'], 'pollHistory-{}.ipa'.format(day.strftime('%Y-%m-%d')))
+
+
+def archived_days():
+    '''Días con archivo, ordenados; solo se vuelve a listar el directorio si cambió'''
+    global _days_cache
+
+    path = config['Archive']['Path']
+    try:
+        mtime = os.stat(path).st_mtime_ns
+    except OSError:
+        return ()
+    if _days_cache[0] == path and _days_cache[1] == mtime:
+        return _days_cache[2]
+    days = []
+    for name in os.listdir(path):
+        match = _FILE_NAME.match(name)
+        if match:
+            days.append(datetime.strptime(match.group(1), '%Y-%m-%d').date())
+    days = tuple(sorted(days))
+    _days_cache = (path, mtime, days)
+    return days
+
+
+class _DayWriter():
+    '''Escribe un archivo de día a partir de filas ordenadas por (host_id, poll_time)'''
+
+    def __init__(self, file, chunk_rows, level):
+        self._file = file
+        self._chunk_rows = chunk_rows
+        self._level = level
+        self._columns = {name: array.array(typecode) for name, typecode in COLUMNS}
+        self._chunks = {name: [] for name, dummy in COLUMNS}
+        self._hosts = []
+        self.rows = 0
+
+    def add(self, host_id, offset, status, rtt_min_us, rtt_avg_us, rtt_max_us, jitter_us, loss_pct):
+        if not self._hosts or self._hosts[-1][0] != host_id:
+            self._hosts.append([host_id, self.rows, 0])
+        self._hosts[-1][2] += 1
+
+        values = (offset, status, rtt_min_us, rtt_avg_us, rtt_max_us, jitter_us, loss_pct)
+        for (name, dummy), value in zip(COLUMNS, values):
+            self._columns[name].append(_NULLS[name] if value is None else value)
+        self.rows += 1
+        if self.rows % self._chunk_rows == 0:
+            self._flush_chunk()
+
+    def close(self):
+        if self.rows % self._chunk_rows:
+            self._flush_chunk()
+
+        host_dir_offset = self._file.tell()
+        for entry in self._hosts:
+            self._file.write(_HOST_ENTRY.pack(*entry))
+        chunk_dir_offset = self._file.tell()
+        num_chunks = len(self._chunks[COLUMNS[0][0]])
+        for name, dummy in COLUMNS:
+            for entry in self._chunks[name]:
+                self._file.write(_CHUNK_ENTRY.pack(*entry))
+        self._file.write(_FOOTER.pack(
+            _MAGIC, _VERSION, self.rows, len(self._hosts), self._chunk_rows, num_chunks,
+            host_dir_offset, chunk_dir_offset
+        ))
+
+    def _flush_chunk(self):
+        for name, typecode in COLUMNS:
+            values = self._columns[name]
+            if sys.byteorder == 'big':
+                values.byteswap()
+            data = zlib.compress(values.tobytes(), self._level)
+            self._chunks[name].append((self._file.tell(), len(data)))
+            self._file.write(data)
+            self._columns[name] = array.array(typecode)
+
+
+class ArchiveDay():
+    '''Lectura de un archivo de día mediante mmap; usar como context manager'''
+
+    def __init__(self, path, day):
+        self.path = path
+        self.day = day
+        self._file = None
+        self._map = None
+
+    def __enter__(self):
+        self._file = open(self.path, 'rb')
+        self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        (
+            magic, version, self.rows, self._num_hosts, self._chunk_rows, self._num_chunks,
+            self._host_dir, self._chunk_dir
+        ) = _FOOTER.unpack_from(self._map, len(self._map) - _FOOTER.size)
+        if magic != _MAGIC or version != _VERSION:
+            raise ValueError('Not an IPMON archive: {}'.format(self.path))
+        return self
+
+    def __exit__(self, *exc):
+        self._map.close()
+        self._file.close()
+
+    def _host_range(self, host_id):
+        # Binary search over the host directory straight from the mapped file
+        entries = _HostDirectory(self._map, self._host_dir, self._num_hosts)
+        i = bisect.bisect_left(entries, host_id)
+        if i == self._num_hosts or entries[i] != host_id:
+            return None
+        dummy, start, count = _HOST_ENTRY.unpack_from(self._map, self._host_dir + i * _HOST_ENTRY.size)
+        return start, count
+
+    def _read_column(self, column_index, start, stop):
+        name, typecode = COLUMNS[column_index]
+        values = array.array(typecode)
+        first_chunk = start // self._chunk_rows
+        last_chunk = (stop - 1) // self._chunk_rows
+        for chunk in range(first_chunk, last_chunk + 1):
+            offset, length = _CHUNK_ENTRY.unpack_from(
+                self._map, self._chunk_dir + (column_index * self._num_chunks + chunk) * _CHUNK_ENTRY.size
+            )
+            values.frombytes(zlib.decompress(self._map[offset:offset + length]))
+        if sys.byteorder == 'big':
+            values.byteswap()
+        skip = first_chunk * self._chunk_rows
+        return values[start - skip:stop - skip]
+
+    def read_host(self, host_id):
+        """Filas archivadas de un host con el formato de Schemas.poll_history
+
+        Args:
+            host_id (int): ID del host
+
+        Returns:
+            list: Diccionarios ordenados por poll_time
+        """
+        host_range = self._host_range(host_id)
+        if host_range is None:
+            return []
+        start, count = host_range
+        columns = {name: self._read_column(i, start, start + count) for i, (name, dummy) in enumerate(COLUMNS)}
+
+        day_start = datetime.combine(self.day, datetime.min.time())
+        day_created = self.day.strftime('%Y-%m-%d')
+        rows = []
+        for i in range(count):
+            row = {
+                'id': None,
+                'host_id': host_id,
+                'poll_time': (day_start + timedelta(seconds=columns['offset'][i])).strftime('%Y-%m-%d %H:%M:%S'),
+                'poll_status': _STATUS[columns['status'][i]] if columns['status'][i] < len(_STATUS) else None,
+                'date_created': day_created
+            }
+            for name in _NULLS:
+                value = columns[name][i]
+                row[name] = None if value == _NULLS[name] else value
+            rows.append(row)
+        return rows
+
+
+class _HostDirectory():
+    '''Vista de solo lectura de los host_id del directorio, para bisect'''
+
+    def __init__(self, buffer, offset, length):
+        self._buffer = buffer
+        self._offset = offset
+        self._length = length
+
+    def __len__(self):
+        return self._length
+
+    def __getitem__(self, i):
+        return _HOST_ENTRY.unpack_from(self._buffer, self._offset + i * _HOST_ENTRY.size)[0]
+
+
+def archive_day(session, day):
+    """Escribe el historial de `day` en su archivo columnar; no borra nada de la base de datos
+
+    Las filas se leen por lotes de hosts sobre el índice (host_id, poll_time), sin cargar el día
+    completo en memoria. El archivo se escribe con otro nombre y se renombra al terminar.
+
+    Args:
+        session (Session): Sesión de SQLAlchemy
+        day (date): Día a archivar
+
+    Returns:
+        int: Filas archivadas
+    """
+    settings = config['Archive']
+    os.makedirs(settings['Path'], exist_ok=True)
+    path = archive_path(day)
+    day_start = datetime.combine(day, datetime.min.time())
+    day_end = day_start + timedelta(days=1)
+    host_ids = sorted(session.execute(select(_poll_history.c.host_id).distinct()).scalars())
+
+    with open(path + '.tmp', 'wb') as file:
+        writer = _DayWriter(file, settings['Chunk_Rows'], settings['Compression_Level'])
+        for i in range(0, len(host_ids), 1000):
+            batch = [host_id for host_id in host_ids[i:i + 1000] if host_id is not None]
+            rows = session.execute(
+                select(
+                    _poll_history.c.host_id, _poll_history.c.poll_time, _poll_history.c.poll_status,
+                    _poll_history.c.rtt_min_us, _poll_history.c.rtt_avg_us, _poll_history.c.rtt_max_us,
+                    _poll_history.c.jitter_us, _poll_history.c.loss_pct
+                )
+                .where(
+                    _poll_history.c.host_id.in_(batch),
+                    _poll_history.c.poll_time >= day_start,
+                    _poll_history.c.poll_time < day_end
+                )
+                .order_by(_poll_history.c.host_id, _poll_history.c.poll_time)
+            )
+            for row in rows:
+                writer.add(
+                    row.host_id,
+                    int((row.poll_time - day_start).total_seconds()),
+                    _STATUS.index(row.poll_status) if row.poll_status in _STATUS else len(_STATUS),
+                    row.rtt_min_us, row.rtt_avg_us, row.rtt_max_us, row.jitter_us, row.loss_pct
+                )
+        writer.close()
+    os.replace(path + '.tmp', path)
+    return writer.rows
+
+
+def read_host_history(host_id, start=None, end=None):
+    """Historial archivado de un host entre los días `start` y `end` (incluidos)
+
+    Args:
+        host_id (int): ID del host
+        start (date, optional): Primer día. Por defecto el más antiguo archivado.
+        end (date, optional): Último día. Por defecto el más reciente archivado.
+
+    Returns:
+        list: Diccionarios con el formato de Schemas.poll_history, ordenados por poll_time
+    """
+    rows = []
+    for day in archived_days():
+        if (start is None or day >= start) and (end is None or day <= end):
+            with ArchiveDay(archive_path(day), day) as archive:
+                rows.extend(archive.read_host(int(host_id)))
+    return rows
+
+
+def purge_archive(cutoff):
+    '''Borra los archivos de días anteriores a `cutoff`; devuelve cuántos'''
+    removed = 0
+    for day in archived_days():
+        if day < cutoff:
+            os.remove(archive_path(day))
+            removed += 1
+    return removed
@@ -13,6 +13,7 @@ from ipmon.database import Users
 from ipmon.schemas import Schemas
 from ipmon.forms import LoginForm, UpdatePasswordForm, UpdateEmailForm
 from ipmon.main import database_configured
+from ipmon.services import invalidate_settings
 
 auth = Blueprint('auth', __name__)
 
@@ -108,6 +109,7 @@ def update_email():
                 current_user = Users.query.filter_by(username=flask_login.current_user.id).first()
                 current_user.email = form.email.data
                 db.session.commit()
+                invalidate_settings()
                 flash('Email successfully updated', 'success')
             except Exception as exc:
                 log.error('Failed to update email address: {}'.format(exc))
@@ -157,6 +159,7 @@ def add_user():
             # add the new user to the database
             db.session.add(new_user)
             db.session.commit()
+            invalidate_settings()
             flash('Succussfully added user {}'.format(new_user.username), 'success')
         except Exception:
             flash('Failed to add user', 'danger')
@@ -19,14 +19,17 @@ class Users(db.Model):
     username = db.Column(db.String(length=20), nullable=False, unique=True)
     email = db.Column(db.String(length=50), nullable=False, unique=True)
     password = db.Column(db.String(length=200), nullable=False)
-    date_created = db.Column(db.Date, default=datetime.now())
+    date_created = db.Column(db.Date, default=datetime.now)
     alerts_enabled = db.Column(db.Boolean, default=True)
 
 
 class Hosts(db.Model):
     '''Tabla de Hosts'''
     __tablename__ = 'hosts'
-    __table_args__ = {'extend_existing': True}
+    __table_args__ = (
+        db.Index('ix_hosts_status', 'status'),
+        {'extend_existing': True}
+    )
 
     id = db.Column(db.Integer, primary_key=True)
     ip_address = db.Column(db.String(length=15), nullable=False, unique=True)
@@ -36,7 +39,7 @@ class Hosts(db.Model):
     dispositivo = db.Column(db.String(length=100))
     tipo = db.Column(db.String(length=100))
     status = db.Column(db.String(length=10))
-    last_poll = db.Column(db.String(length=20))
+    last_poll = db.Column(db.DateTime)
     previous_status = db.Column(db.String(length=10))
     alerts_enabled = db.Column(db.Boolean, default=True)
     poll_history = db.relationship("PollHistory")
@@ -46,30 +49,125 @@ class Hosts(db.Model):
 class PollHistory(db.Model):
     '''Tabla Historial de sondeo de dispositivos'''
     __tablename__ = 'pollHistory'
-    __table_args__ = {'extend_existing': True}
+    __table_args__ = (
+        db.Index('ix_pollHistory_date_created', 'date_created'),
+        db.Index('ix_pollHistory_host_id_poll_time', 'host_id', 'poll_time'),
+        {'extend_existing': True}
+    )
 
     id = db.Column(db.Integer, primary_key=True)
-    poll_time = db.Column(db.String(length=20))
+    poll_time = db.Column(db.DateTime)
     poll_status = db.Column(db.String(length=20))
-    date_created = db.Column(db.Date, default=datetime.now())
+    rtt_min_us = db.Column(db.Integer)
+    rtt_avg_us = db.Column(db.Integer)
+    rtt_max_us = db.Column(db.Integer)
+    jitter_us = db.Column(db.Integer)
+    loss_pct = db.Column(db.SmallInteger)
+    date_created = db.Column(db.Date, default=datetime.now)
+    host_id = db.Column(db.Integer, db.ForeignKey('hosts.id'))
+
+
+class HostStatusIntervals(db.Model):
+    '''Tabla Intervalos de estado por host (historial por cambios de estado)'''
+    __tablename__ = 'hostStatusIntervals'
+    __table_args__ = (
+        db.Index('ix_hostStatusIntervals_host_id_start_time', 'host_id', 'start_time'),
+        db.Index('ix_hostStatusIntervals_end_time', 'end_time'),
+        {'extend_existing': True}
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    status = db.Column(db.String(length=10))
+    start_time = db.Column(db.DateTime)
+    end_time = db.Column(db.DateTime)
     host_id = db.Column(db.Integer, db.ForeignKey('hosts.id'))
 
 
+class HostRollupsHourly(db.Model):
+    '''Tabla Agregados por hora del sondeo de cada host'''
+    __tablename__ = 'hostRollupsHourly'
+    __table_args__ = (
+        db.UniqueConstraint('host_id', 'period_start', name='uq_hostRollupsHourly_host_id_period_start'),
+        {'extend_existing': True}
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    period_start = db.Column(db.String(length=20), nullable=False)
+    poll_count = db.Column(db.Integer, default=0, nullable=False)
+    up_count = db.Column(db.Integer, default=0, nullable=False)
+    seconds = db.Column(db.Integer, default=0, nullable=False)
+    up_seconds = db.Column(db.Integer, default=0, nullable=False)
+    transitions = db.Column(db.Integer, default=0, nullable=False)
+    rtt_count = db.Column(db.Integer, default=0, nullable=False)
+    rtt_sum_us = db.Column(db.BigInteger, default=0, nullable=False)
+    rtt_min_us = db.Column(db.Integer)
+    rtt_max_us = db.Column(db.Integer)
+    host_id = db.Column(db.Integer, db.ForeignKey('hosts.id'), nullable=False)
+
+
+class HostRollupsDaily(db.Model):
+    '''Tabla Agregados por día del sondeo de cada host'''
+    __tablename__ = 'hostRollupsDaily'
+    __table_args__ = (
+        db.UniqueConstraint('host_id', 'period_start', name='uq_hostRollupsDaily_host_id_period_start'),
+        {'extend_existing': True}
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    period_start = db.Column(db.String(length=20), nullable=False)
+    poll_count = db.Column(db.Integer, default=0, nullable=False)
+    up_count = db.Column(db.Integer, default=0, nullable=False)
+    seconds = db.Column(db.Integer, default=0, nullable=False)
+    up_seconds = db.Column(db.Integer, default=0, nullable=False)
+    transitions = db.Column(db.Integer, default=0, nullable=False)
+    rtt_count = db.Column(db.Integer, default=0, nullable=False)
+    rtt_sum_us = db.Column(db.BigInteger, default=0, nullable=False)
+    rtt_min_us = db.Column(db.Integer)
+    rtt_max_us = db.Column(db.Integer)
+    host_id = db.Column(db.Integer, db.ForeignKey('hosts.id'), nullable=False)
+
+
 class HostAlerts(db.Model):
     '''Tabla Alertas por cambio de estado del host'''
     __tablename__ = 'hostAlerts'
-    __table_args__ = {'extend_existing': True}
+    __table_args__ = (
+        db.Index('ix_hostAlerts_alert_cleared_host_id', 'alert_cleared', 'host_id'),
+        db.Index('ix_hostAlerts_host_id_poll_time', 'host_id', 'poll_time'),
+        {'extend_existing': True}
+    )
 
     id = db.Column(db.Integer, primary_key=True)
     hostname = db.Column(db.String(length=100))
     ip_address = db.Column(db.String(length=15))
     host_status = db.Column(db.String(length=20))
-    poll_time = db.Column(db.String(length=20))
+    poll_time = db.Column(db.DateTime)
     alert_cleared = db.Column(db.Boolean, default=False)
-    date_created = db.Column(db.Date, default=datetime.now())
+    date_created = db.Column(db.Date, default=datetime.now)
     host_id = db.Column(db.Integer, db.ForeignKey('hosts.id'))
 
 
+class DeletedHosts(db.Model):
+    '''Tabla Hosts eliminados; SQLite puede reutilizar su ID, y sus días archivados no son del host nuevo'''
+    __tablename__ = 'deletedHosts'
+    __table_args__ = {'extend_existing': True}
+
+    host_id = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    deleted_on = db.Column(db.Date, nullable=False)
+
+
+class RetentionRuns(db.Model):
+    '''Tabla Ejecuciones de la limpieza del historial'''
+    __tablename__ = 'retentionRuns'
+    __table_args__ = {'extend_existing': True}
+
+    id = db.Column(db.Integer, primary_key=True)
+    run_time = db.Column(db.String(length=20))
+    cutoff = db.Column(db.String(length=20))
+    rows_deleted = db.Column(db.Integer, default=0, nullable=False)
+    chunks = db.Column(db.Integer, default=0, nullable=False)
+    seconds = db.Column(db.Float, default=0.0, nullable=False)
+
+
 class Polling(db.Model):
     '''Tabla Configuración consultas'''
     __tablename__ = 'polling'
@@ -78,6 +176,7 @@ class Polling(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     poll_interval = db.Column(db.Integer, default=60, nullable=False)
     history_truncate_days = db.Column(db.Integer, default=10, nullable=False)
+    max_probes_per_second = db.Column(db.Integer, default=1000, nullable=False)
 
 
 class SmtpServer(db.Model):
@@ -93,6 +192,20 @@ class SmtpServer(db.Model):
     smtp_password = db.Column(db.String(128))
 
 
+# Rows of settingsVersion
+SETTINGS_VERSION_ID = 1
+HOSTS_VERSION_ID = 2
+
+
+class SettingsVersion(db.Model):
+    '''Tabla Versión de la configuración (fila 1) y de la lista de hosts (fila 2); cambian con cada escritura para invalidar la caché de cada proceso'''
+    __tablename__ = 'settingsVersion'
+    __table_args__ = {'extend_existing': True}
+
+    id = db.Column(db.Integer, primary_key=True)
+    version = db.Column(db.Integer, default=0, nullable=False)
+
+
 class WebThemes(db.Model):
     '''Temas CSS para la web '''
     __tablename__ = 'webThemes'
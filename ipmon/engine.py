@@ -0,0 +1,40 @@
+'''Ajustes del motor SQLite: PRAGMAs por conexión'''
+from sqlalchemy import event
+
+
+def engine_options(settings):
+    """Opciones de create_engine para la base SQLite según config['SQLite']
+
+    El pool es el QueuePool por defecto de SQLAlchemy; solo se fija la espera por bloqueos.
+
+    Args:
+        settings (dict): config['SQLite']
+
+    Returns:
+        dict: Valor para SQLALCHEMY_ENGINE_OPTIONS
+    """
+    return {'connect_args': {'timeout': settings['Busy_Timeout'] / 1000}}
+
+
+def apply_pragmas(engine, settings):
+    """Aplica los PRAGMAs de config['SQLite'] a cada conexión nueva del motor
+
+    WAL deja a los lectores web leer mientras el escritor confirma, y con synchronous=NORMAL cada
+    commit no espera un fsync; la durabilidad se pierde solo ante un corte de energía, no del proceso.
+
+    Args:
+        engine (Engine): Motor de SQLAlchemy sobre SQLite
+        settings (dict): config['SQLite']
+    """
+    pragmas = [
+        'PRAGMA journal_mode={}'.format(settings['Journal_Mode']),
+        'PRAGMA synchronous={}'.format(settings['Synchronous']),
+        'PRAGMA busy_timeout={:d}'.format(settings['Busy_Timeout'])
+    ]
+
+    @event.listens_for(engine, 'connect')
+    def set_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        for pragma in pragmas:
+            cursor.execute(pragma)
+        cursor.close()
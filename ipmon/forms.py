@@ -79,4 +79,5 @@ class SelectThemeForm(FlaskForm):
 class PollingConfigForm(FlaskForm):
     interval = StringField('Intervalo de consultas')
     retention_days = StringField('Días de almacenamiento de consultas')
+    max_probes_per_second = StringField('Sondas por segundo')
     submit = SubmitField('Actualizar')
@@ -0,0 +1,324 @@
+'''Consultas de historial y disponibilidad de los hosts'''
+import os
+import sys
+import math
+
+from datetime import datetime, date, timedelta, time
+from sqlalchemy import func, select
+
+sys.path.append(os.path.dirname(os.path.realpath(__file__)) + '/../')
+from ipmon import db, config
+from ipmon.database import PollHistory, HostStatusIntervals, HostRollupsHourly, HostRollupsDaily, DeletedHosts
+from ipmon.archive import archived_days, read_host_history
+from ipmon.rollups import hour_start, day_start
+from ipmon.schemas import PollHistorySchema, HostRollupsSchema
+from ipmon.serialize import columns, rows
+
+TIME_FORMAT = '%Y-%m-%d %H:%M:%S'
+
+
+def get_host_history(host_id, start=None, end=None, before=None, limit=None):
+    """Una página del historial de sondeo de un host, del más reciente al más antiguo
+
+    En modo 'intervals' cada fila representa una racha de sondeos con el mismo estado: `poll_time`
+    es su inicio y `end_time` el último sondeo de la racha. En modo 'polls' incluye los días ya
+    movidos al archivo columnar, que solo se leen si la página no se completa con la base de datos.
+
+    Args:
+        host_id (int): ID del host
+        start (datetime, optional): Sondeos desde este momento (incluido)
+        end (datetime, optional): Sondeos hasta este momento (incluido)
+        before (datetime, optional): Cursor: solo sondeos anteriores a este momento
+        limit (int, optional): Filas por página. Por defecto config['History_Query']['Page_Size'].
+
+    Returns:
+        tuple: Lista de diccionarios con al menos `poll_time` y `poll_status`, y el cursor de la
+            página siguiente (el `poll_time` de la última fila) o None si no hay más
+    """
+    limit = limit or config['History_Query']['Page_Size']
+    bounds = [value.strftime(TIME_FORMAT) if value is not None else None for value in (start, end, before)]
+
+    if config['History_Mode'] == 'intervals':
+        intervals = HostStatusIntervals.query.filter_by(host_id=host_id)
+        if start is not None:
+            intervals = intervals.filter(HostStatusIntervals.start_time >= start)
+        if end is not None:
+            intervals = intervals.filter(HostStatusIntervals.start_time <= end)
+        if before is not None:
+            intervals = intervals.filter(HostStatusIntervals.start_time < before)
+        history = [
+            {
+                'id': interval.id,
+                'host_id': interval.host_id,
+                'poll_time': interval.start_time,
+                'end_time': interval.end_time,
+                'poll_status': interval.status
+            }
+            for interval in intervals.order_by(HostStatusIntervals.start_time.desc()).limit(limit + 1)
+        ]
+        return _page(history, limit)
+
+    polls = select(*columns(PollHistory, PollHistorySchema.Meta.fields)).where(PollHistory.host_id == host_id)
+    if start is not None:
+        polls = polls.where(PollHistory.poll_time >= start)
+    if end is not None:
+        polls = polls.where(PollHistory.poll_time <= end)
+    if before is not None:
+        polls = polls.where(PollHistory.poll_time < before)
+    days = archived_days() if config['Archive']['Enabled'] else []
+    if days:
+        # Skip rows of archived days still waiting for retention to delete them
+        polls = polls.where(PollHistory.poll_time >= datetime.combine(days[-1] + timedelta(days=1), time.min))
+    history = rows(db.session.execute(polls.order_by(PollHistory.poll_time.desc()).limit(limit + 1)))
+
+    first_day = _first_archived_day(host_id) if days else None
+    for day in reversed(days):
+        if len(history) > limit or (start is not None and day < start.date()) or (first_day and day < first_day):
+            break
+        if any(bound is not None and day > bound.date() for bound in (end, before)):
+            continue
+        history.extend(row for row in reversed(read_host_history(host_id, day, day)) if _in_range(row['poll_time'], *bounds))
+    return _page(history, limit)
+
+
+def get_history_buckets(host_id, start, end, resolution):
+    """Historial de un host agregado en intervalos de `resolution` segundos
+
+    La resolución se amplía si hiciera falta para no pasar de config['History_Query']['Max_Buckets']
+    intervalos. En modo 'polls' cada intervalo trae la fracción de sondeos Up y los percentiles del
+    RTT medio; en modo 'intervals' la fracción del tiempo en que el host estuvo Up.
+
+    Args:
+        host_id (int): ID del host
+        start (datetime): Inicio del rango
+        end (datetime): Fin del rango
+        resolution (int): Segundos por intervalo
+
+    Returns:
+        tuple: Resolución usada y lista de diccionarios por intervalo con datos, ordenada por `start`
+    """
+    span = max((end - start).total_seconds(), 1)
+    resolution = max(int(resolution), 1, math.ceil(span / config['History_Query']['Max_Buckets']))
+    buckets = {}
+
+    if config['History_Mode'] == 'intervals':
+        intervals = HostStatusIntervals.query.filter(
+            HostStatusIntervals.host_id == host_id,
+            HostStatusIntervals.end_time >= start,
+            HostStatusIntervals.start_time <= end
+        ).order_by(HostStatusIntervals.start_time).all()
+        for i, interval in enumerate(intervals):
+            # Each run lasts until the next one starts
+            run_end = intervals[i + 1].start_time if i + 1 < len(intervals) else interval.end_time
+            _spread(buckets, start, end, resolution, interval.start_time, run_end, interval.status == 'Up')
+        return resolution, [
+            {
+                'start': (start + timedelta(seconds=index * resolution)).strftime(TIME_FORMAT),
+                'up_ratio': bucket['up_seconds'] / bucket['seconds'] if bucket['seconds'] else None
+            }
+            for index, bucket in sorted(buckets.items())
+        ]
+
+    # Polls are spaced unevenly by adaptive polling, so each one covers the time since the previous
+    # one, spread over the buckets it spans; the first poll of the range covers none
+    times = {}
+    previous = None
+    for poll_time, status, rtt, loss in _iter_polls(host_id, start, end):
+        if previous is not None:
+            _spread(times, start, end, resolution, previous, poll_time, status == 'Up')
+        previous = poll_time
+        index = int((poll_time - start).total_seconds() // resolution)
+        bucket = buckets.get(index)
+        if bucket is None:
+            bucket = buckets[index] = {'polls': 0, 'up': 0, 'rtts': [], 'loss_sum': 0, 'loss_count': 0}
+        bucket['polls'] += 1
+        if status == 'Up':
+            bucket['up'] += 1
+        if rtt is not None:
+            bucket['rtts'].append(rtt)
+        if loss is not None:
+            bucket['loss_sum'] += loss
+            bucket['loss_count'] += 1
+
+    result = []
+    for index in sorted(buckets.keys() | times.keys()):
+        bucket = buckets.get(index, {'polls': 0, 'up': 0, 'rtts': [], 'loss_sum': 0, 'loss_count': 0})
+        time_bucket = times.get(index)
+        if time_bucket is not None and time_bucket['seconds']:
+            up_ratio = time_bucket['up_seconds'] / time_bucket['seconds']
+        else:
+            up_ratio = bucket['up'] / bucket['polls']
+        rtts = sorted(bucket['rtts'])
+        result.append({
+            'start': (start + timedelta(seconds=index * resolution)).strftime(TIME_FORMAT),
+            'polls': bucket['polls'],
+            'up_ratio': up_ratio,
+            'rtt_p50_us': _percentile(rtts, 50),
+            'rtt_p95_us': _percentile(rtts, 95),
+            'rtt_max_us': rtts[-1] if rtts else None,
+            'loss_pct': bucket['loss_sum'] / bucket['loss_count'] if bucket['loss_count'] else None
+        })
+    return resolution, result
+
+
+def _spread(buckets, start, end, resolution, run_start, run_end, up):
+    '''Suma los segundos de `run_start` a `run_end` (recortados a la ventana) a los buckets que abarcan'''
+    run_start = max(run_start, start)
+    run_end = min(run_end, end)
+    while run_start < run_end:
+        index = int((run_start - start).total_seconds() // resolution)
+        bucket_end = min(start + timedelta(seconds=(index + 1) * resolution), run_end)
+        bucket = buckets.setdefault(index, {'seconds': 0.0, 'up_seconds': 0.0})
+        seconds = (bucket_end - run_start).total_seconds()
+        bucket['seconds'] += seconds
+        if up:
+            bucket['up_seconds'] += seconds
+        run_start = bucket_end
+
+
+def _iter_polls(host_id, start, end):
+    '''(poll_time, estado, RTT medio, pérdida) de los sondeos entre `start` y `end` en orden, del archivo y la base de datos'''
+    polls = PollHistory.query.with_entities(
+        PollHistory.poll_time, PollHistory.poll_status, PollHistory.rtt_avg_us, PollHistory.loss_pct
+    ).filter(PollHistory.host_id == host_id, PollHistory.poll_time >= start, PollHistory.poll_time <= end)
+
+    days = archived_days() if config['Archive']['Enabled'] else []
+    if days:
+        bounds = (start.strftime(TIME_FORMAT), end.strftime(TIME_FORMAT), None)
+        first_day = max(start.date(), _first_archived_day(host_id) or date.min)
+        for row in read_host_history(host_id, first_day, end.date()):
+            if _in_range(row['poll_time'], *bounds):
+                yield datetime.strptime(row['poll_time'], TIME_FORMAT), row['poll_status'], row['rtt_avg_us'], row['loss_pct']
+        polls = polls.filter(PollHistory.poll_time >= datetime.combine(days[-1] + timedelta(days=1), time.min))
+    yield from polls.order_by(PollHistory.poll_time).yield_per(5000)
+
+
+def _first_archived_day(host_id):
+    '''Primer día archivado que pertenece al host, o None; los anteriores son de un host eliminado con el mismo ID'''
+    return db.session.execute(select(DeletedHosts.deleted_on).where(DeletedHosts.host_id == host_id)).scalar()
+
+
+def _in_range(poll_time, start, end, before):
+    return (start is None or poll_time >= start) and (end is None or poll_time <= end) and \
+        (before is None or poll_time < before)
+
+
+def _page(history, limit):
+    if len(history) > limit:
+        return history[:limit], history[limit - 1]['poll_time']
+    return history, None
+
+
+def _percentile(values, percent):
+    '''Percentil por rango más cercano de una lista ordenada'''
+    if not values:
+        return None
+    return values[max(math.ceil(percent / 100 * len(values)) - 1, 0)]
+
+
+def get_availability(host_id, since, now=None):
+    """Disponibilidad de un host desde `since`
+
+    Es la fracción del tiempo en que el host estuvo Up. En modo 'polls' cada sondeo cuenta por el
+    tiempo transcurrido desde el sondeo anterior del host, porque el sondeo adaptativo sondea más a
+    menudo los hosts caídos; en modo 'intervals' cada racha cuenta hasta el inicio de la siguiente.
+
+    Args:
+        host_id (int): ID del host
+        since (datetime): Inicio de la ventana
+        now (datetime, optional): Momento con el que se calculó `since`. Por defecto ahora.
+
+    Returns:
+        float: Valor entre 0 y 1, o None si no hay datos en la ventana
+    """
+    now = now or datetime.now()
+    if config['History_Mode'] != 'intervals' and now - since > timedelta(days=1):
+        # Long windows read the hourly aggregates instead of raw polls, and the daily ones for the
+        # days whose hourly aggregates are past Rollup_Retention_Days
+        hourly_start = datetime.combine(date.today() - timedelta(days=config['Rollup_Retention_Days']['Hourly']), time.min)
+        totals = _rollup_totals(HostRollupsHourly, host_id, hour_start(max(since, hourly_start)))
+        if since < hourly_start:
+            daily = _rollup_totals(HostRollupsDaily, host_id, day_start(since), day_start(hourly_start))
+            totals = [hourly + daily for hourly, daily in zip(totals, daily)]
+        polls, up, seconds, up_seconds = totals
+        if polls:
+            return _time_ratio(up_seconds, seconds, up, polls)
+        # No aggregates written yet for this host; fall back to the raw history
+
+    if config['History_Mode'] != 'intervals':
+        polls = up = 0
+        seconds = up_seconds = 0.0
+        previous = None
+        for poll_time, status in PollHistory.query.with_entities(PollHistory.poll_time, PollHistory.poll_status).filter(
+            PollHistory.host_id == host_id, PollHistory.poll_time >= since
+        ).order_by(PollHistory.poll_time).yield_per(5000):
+            polls += 1
+            if previous is not None:
+                # The first poll of the window covers no time
+                elapsed = (poll_time - previous).total_seconds()
+                seconds += elapsed
+                if status == 'Up':
+                    up_seconds += elapsed
+            if status == 'Up':
+                up += 1
+            previous = poll_time
+        return _time_ratio(up_seconds, seconds, up, polls)
+
+    intervals = HostStatusIntervals.query.filter(
+        HostStatusIntervals.host_id == host_id,
+        HostStatusIntervals.end_time >= since
+    ).order_by(HostStatusIntervals.start_time).all()
+    if not intervals:
+        return None
+
+    up = total = 0.0
+    for i, interval in enumerate(intervals):
+        start = max(interval.start_time, since)
+        end = intervals[i + 1].start_time if i + 1 < len(intervals) else interval.end_time
+        duration = max(0.0, (end - start).total_seconds())
+        total += duration
+        if interval.status == 'Up':
+            up += duration
+
+    if not total:
+        return 1.0 if intervals[-1].status == 'Up' else 0.0
+    return up / total
+
+
+def _rollup_totals(model, host_id, start, end=None):
+    '''Sondeos, sondeos Up, segundos y segundos Up de los agregados de `model` desde `start` (y antes de `end`)'''
+    query = model.query.with_entities(
+        func.sum(model.poll_count), func.sum(model.up_count), func.sum(model.seconds), func.sum(model.up_seconds)
+    ).filter(model.host_id == host_id, model.period_start >= start)
+    if end is not None:
+        query = query.filter(model.period_start < end)
+    return [value or 0 for value in query.one()]
+
+
+def _time_ratio(up_seconds, seconds, up, polls):
+    '''Fracción del tiempo Up; la de sondeos Up si no hay tiempo contado (un solo sondeo o agregados anteriores)'''
+    if seconds:
+        return up_seconds / seconds
+    return up / polls if polls else None
+
+
+def get_rollups(host_id, period, since):
+    """Agregados de un host desde `since`; solo se generan en modo 'polls'
+
+    Args:
+        host_id (int): ID del host
+        period (str): 'hourly' o 'daily'
+        since (datetime): Inicio de la ventana
+
+    Returns:
+        list: Diccionarios con los contadores del periodo
+    """
+    if period == 'daily':
+        model, period_start = HostRollupsDaily, day_start(since)
+    else:
+        model, period_start = HostRollupsHourly, hour_start(since)
+    return rows(db.session.execute(
+        select(*columns(model, HostRollupsSchema.Meta.fields))
+        .where(model.host_id == host_id, model.period_start >= period_start)
+        .order_by(model.period_start)
+    ))
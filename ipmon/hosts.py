@@ -1,21 +1,23 @@
 '''Modulo de HOSTS'''
-import json
 import os
 import sys
 import ipaddress
 import platform
 import subprocess
 
+from datetime import date
 from multiprocessing.pool import ThreadPool
 
 import flask_login
 from flask import Blueprint, flash, redirect, render_template, request, url_for, jsonify
 
 from ipmon import config, db, log
-from ipmon.api import get_all_hosts
-from ipmon.database import HostAlerts, Hosts, PollHistory
+from ipmon.database import HostAlerts, Hosts, PollHistory, HostStatusIntervals, HostRollupsHourly, HostRollupsDaily, \
+    DeletedHosts
 from ipmon.forms import AddHostsForm
 from ipmon.polling import poll_host
+from ipmon.services import get_hosts
+from ipmon.targets import probe_targets
 
 sys.path.append(os.path.dirname(os.path.realpath(__file__)) + '/../')
 
@@ -83,6 +85,7 @@ def add_hosts():
 
             try:
                 db.session.commit()
+                probe_targets.invalidate()
             except Exception as exc:
                 db.session.rollback()
                 flash('Error al guardar los cambios en la base de datos.', 'danger')
@@ -100,7 +103,7 @@ def add_hosts():
 def update_hosts():
     '''Actualizar dispositivos'''
     if request.method == 'GET':
-        return render_template('updateHosts.html', hosts=json.loads(get_all_hosts()))
+        return render_template('updateHosts.html', hosts=get_hosts())
     elif request.method == 'POST':
         results = request.form.to_dict()
         host = Hosts.query.filter_by(id=int(results['id'])).first()
@@ -120,6 +123,7 @@ def update_hosts():
             if results['alerts'] != str(host.alerts_enabled):
                 host.alerts_enabled = False if results['alerts'] == 'False' else True
             db.session.commit()
+            probe_targets.invalidate()
             flash('Dispositivo actualizado correctamente {}'.format(host.hostname), 'success')
         except Exception:
             flash('Fallo al actualizar la información del dispositivo {}'.format(host.hostname), 'danger')
@@ -136,9 +140,15 @@ def delete_host():
         host_id = int(results['id'])
         try:
             PollHistory.query.filter_by(host_id=host_id).delete()
+            HostStatusIntervals.query.filter_by(host_id=host_id).delete()
+            HostRollupsHourly.query.filter_by(host_id=host_id).delete()
+            HostRollupsDaily.query.filter_by(host_id=host_id).delete()
             HostAlerts.query.filter_by(host_id=host_id).delete()
             Hosts.query.filter_by(id=host_id).delete()
+            # Archived days before today are not rewritten; a new host that reuses the ID skips them
+            db.session.merge(DeletedHosts(host_id=host_id, deleted_on=date.today()))
             db.session.commit()
+            probe_targets.invalidate()
             flash('Dispositivo eliminado exitosamente! {}'.format(results['hostname']), 'success')
         except Exception as exc:
             flash('No se pudo eliminar el dispositivo {}: {}'.format(results['hostname'], exc), 'danger')
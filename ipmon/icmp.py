@@ -0,0 +1,309 @@
+'''Sondeo ICMP nativo sobre asyncio'''
+import os
+import re
+import sys
+import time
+import socket
+import struct
+import asyncio
+import platform
+
+from collections import namedtuple
+
+sys.path.append(os.path.dirname(os.path.realpath(__file__)) + '/../')
+from ipmon import log
+
+ICMP_ECHO_REPLY = 0
+ICMP_ECHO_REQUEST = 8
+
+_ICMP_HEADER = struct.Struct('!BBHHH')
+_PING_TIME = re.compile(r'(?:time|tiempo)[=<]\s*([\d.]+)')
+
+# RTTs in milliseconds, loss in percent of echoes sent
+ProbeResult = namedtuple(
+    'ProbeResult',
+    ['status', 'rtt', 'rtt_min', 'rtt_max', 'jitter', 'loss'],
+    defaults=(None, None, None, None, 100)
+)
+
+
+def _checksum(data):
+    '''Checksum de Internet (RFC 1071)'''
+    if len(data) % 2:
+        data += b'\x00'
+    total = sum(struct.unpack('!{}H'.format(len(data) // 2), data))
+    total = (total >> 16) + (total & 0xFFFF)
+    total += total >> 16
+    return ~total & 0xFFFF
+
+
+def _summarize(rtts, sent):
+    '''Construye el ProbeResult de una sonda a partir de los RTT recibidos y los echo enviados'''
+    if not rtts:
+        return ProbeResult('Down')
+    loss = round(100 * (sent - len(rtts)) / sent) if sent > len(rtts) else 0
+    # Mean difference between consecutive replies; a single reply has no jitter of its own
+    jitter = sum(abs(b - a) for a, b in zip(rtts, rtts[1:])) / (len(rtts) - 1) if len(rtts) > 1 else None
+    return ProbeResult('Up', sum(rtts) / len(rtts), min(rtts), max(rtts), jitter, loss)
+
+
+def _open_icmp_socket():
+    '''Abre un socket ICMP datagrama sin privilegios, o raw si el kernel no lo permite'''
+    try:
+        return socket.socket(socket.AF_INET, socket.SOCK_DGRAM, socket.IPPROTO_ICMP), False
+    except OSError:
+        return socket.socket(socket.AF_INET, socket.SOCK_RAW, socket.IPPROTO_ICMP), True
+
+
+class IcmpProber():
+    '''Envía ICMP echo por un único socket compartido y empareja las respuestas por id/secuencia'''
+
+    def __init__(self, loop=None, pacer=None):
+        self._loop = loop or asyncio.get_running_loop()
+        self._pacer = pacer
+        self._sock, self._raw = _open_icmp_socket()
+        self._sock.setblocking(False)
+        self._identifier = os.getpid() & 0xFFFF
+        self._sequence = 0
+        self._pending = {}
+        self._loop.add_reader(self._sock.fileno(), self._on_readable)
+
+    def close(self):
+        '''Cierra el socket y cancela las sondas pendientes'''
+        self._loop.remove_reader(self._sock.fileno())
+        self._sock.close()
+        for waiter in self._pending.values():
+            if not waiter.done():
+                waiter.cancel()
+        self._pending.clear()
+
+    async def ping(self, address, count=3, timeout=1.0, fast=False, max_timeout=None):
+        """Sondea una dirección enviando hasta `count` echo ICMP
+
+        Args:
+            address (str): Dirección IPv4 o nombre del host
+            count (int, optional): Número de echo a enviar. Defaults to 3.
+            timeout (float, optional): Segundos de espera por cada respuesta. Defaults to 1.0.
+            fast (bool, optional): Terminar con la primera respuesta y reintentar solo si se pierde. Defaults to False.
+            max_timeout (float, optional): En modo fast el timeout se duplica en cada reintento hasta este valor. Defaults to None.
+
+        Returns:
+            ProbeResult: 'Up' si respondió al menos un echo, con RTT mínimo/medio/máximo y pérdida
+        """
+        try:
+            address = await self._resolve(address)
+        except OSError:
+            return ProbeResult('Down')
+
+        rtts = []
+        sent = 0
+        for dummy in range(count):
+            sent += 1
+            rtt = await self._echo(address, timeout)
+            if rtt is not None:
+                rtts.append(rtt)
+                if fast:
+                    break
+            elif fast and max_timeout:
+                timeout = min(timeout * 2, max_timeout)
+
+        return _summarize(rtts, sent)
+
+    async def _resolve(self, address):
+        try:
+            socket.inet_aton(address)
+            return address
+        except OSError:
+            infos = await self._loop.getaddrinfo(address, None, family=socket.AF_INET)
+            return infos[0][4][0]
+
+    async def _echo(self, address, timeout):
+        self._sequence = (self._sequence + 1) & 0xFFFF
+        sequence = self._sequence
+        payload = struct.pack('!d', time.time())
+        header = _ICMP_HEADER.pack(ICMP_ECHO_REQUEST, 0, 0, self._identifier, sequence)
+        packet = _ICMP_HEADER.pack(
+            ICMP_ECHO_REQUEST, 0, _checksum(header + payload), self._identifier, sequence
+        ) + payload
+
+        if self._pacer:
+            await self._pacer.acquire()
+
+        key = (address, sequence)
+        waiter = self._loop.create_future()
+        self._pending[key] = waiter
+        sent = time.perf_counter()
+        try:
+            self._sock.sendto(packet, (address, 0))
+            received = await asyncio.wait_for(waiter, timeout)
+        except (asyncio.TimeoutError, OSError):
+            return None
+        finally:
+            self._pending.pop(key, None)
+
+        return (received - sent) * 1000
+
+    def _on_readable(self):
+        received = time.perf_counter()
+        while True:
+            try:
+                data, source = self._sock.recvfrom(2048)
+            except (BlockingIOError, InterruptedError):
+                return
+            except OSError as exc:
+                log.error('ICMP socket receive failed: {}'.format(exc))
+                return
+
+            if self._raw:
+                # Raw sockets deliver the IP header as well
+                data = data[(data[0] & 0x0F) * 4:]
+            if len(data) < _ICMP_HEADER.size:
+                continue
+
+            icmp_type, dummy, dummy, identifier, sequence = _ICMP_HEADER.unpack_from(data)
+            if icmp_type != ICMP_ECHO_REPLY:
+                continue
+            # Datagram sockets only see their own replies; the kernel rewrites the identifier
+            if self._raw and identifier != self._identifier:
+                continue
+
+            waiter = self._pending.get((source[0], sequence))
+            if waiter is not None and not waiter.done():
+                waiter.set_result(received)
+
+
+class SubprocessProber():
+    '''Prober de respaldo que ejecuta el comando ping del sistema'''
+
+    def __init__(self, pacer=None):
+        self._pacer = pacer
+
+    def close(self):
+        '''Nada que liberar'''
+
+    async def ping(self, address, count=3, timeout=1.0, fast=False, max_timeout=None):
+        """Sondea una dirección ejecutando ping
+
+        Args:
+            address (str): Dirección IPv4 o nombre del host
+            count (int, optional): Número de echo a enviar. Defaults to 3.
+            timeout (float, optional): Segundos de espera por cada respuesta. Defaults to 1.0.
+            fast (bool, optional): Ejecutar ping de un echo, reintentando solo si se pierde. Defaults to False.
+            max_timeout (float, optional): En modo fast el timeout se duplica en cada reintento hasta este valor. Defaults to None.
+
+        Returns:
+            ProbeResult: 'Up' si el host respondió, con RTT mínimo/medio/máximo y pérdida
+        """
+        if not fast:
+            return self._result(await self._run(address, count, timeout), count)
+
+        for sent in range(1, count + 1):
+            output = await self._run(address, 1, timeout)
+            if output is not None:
+                return self._result(output, sent)
+            if max_timeout:
+                timeout = min(timeout * 2, max_timeout)
+        return ProbeResult('Down')
+
+    @staticmethod
+    def _result(output, sent):
+        if output is None:
+            return ProbeResult('Down')
+        rtts = [float(rtt) for rtt in _PING_TIME.findall(output)]
+        if not rtts:
+            # Replied, but the output is in a format we cannot parse RTTs from
+            return ProbeResult('Up', loss=None)
+        return _summarize(rtts, sent)
+
+    async def _run(self, address, count, timeout):
+        '''Ejecuta ping y devuelve su salida, o None si el host no respondió'''
+        windows = platform.system().lower() == 'windows'
+        if windows:
+            command = ['ping', '-n', str(count), '-w', str(int(timeout * 1000)), address]
+        else:
+            command = ['ping', '-c', str(count), '-W', str(max(1, round(timeout))), address]
+
+        if self._pacer:
+            await self._pacer.acquire(count)
+
+        try:
+            process = await asyncio.create_subprocess_exec(
+                *command,
+                stdout=asyncio.subprocess.PIPE,
+                stderr=asyncio.subprocess.DEVNULL
+            )
+            stdout, dummy = await process.communicate()
+        except OSError:
+            return None
+
+        output = stdout.decode(errors='ignore').lower()
+        success = 'ttl=' in output if windows else process.returncode == 0
+        return output if success else None
+
+
+class RttEstimator():
+    '''Estimación del RTT de cada host (RFC 6298) para derivar el timeout de sus sondas, y su jitter (RFC 3550)'''
+
+    def __init__(self, min_timeout=0.2, max_timeout=1.0):
+        self.min_timeout = min_timeout
+        self.max_timeout = max_timeout
+        self._estimates = {}
+        # address -> (last RTT, jitter or None until a second sample)
+        self._jitter = {}
+
+    def timeout(self, address):
+        '''Timeout en segundos para la próxima sonda; el máximo si aún no hay muestras'''
+        estimate = self._estimates.get(address)
+        if estimate is None:
+            return self.max_timeout
+        srtt, rttvar = estimate
+        return min(self.max_timeout, max(self.min_timeout, (srtt + 4 * rttvar) / 1000))
+
+    def jitter(self, address):
+        '''Variación suavizada entre RTT consecutivos en milisegundos, o None con menos de dos muestras'''
+        state = self._jitter.get(address)
+        return state[1] if state else None
+
+    def update(self, address, rtt):
+        '''Incorpora un RTT medido en milisegundos'''
+        if rtt is None:
+            return
+        # RTTVAR starts at rtt / 2, a guess; jitter only uses measured differences
+        state = self._jitter.get(address)
+        if state is None:
+            self._jitter[address] = (rtt, None)
+        elif state[1] is None:
+            self._jitter[address] = (rtt, abs(rtt - state[0]))
+        else:
+            last, jitter = state
+            self._jitter[address] = (rtt, jitter + (abs(rtt - last) - jitter) / 16)
+
+        estimate = self._estimates.get(address)
+        if estimate is None:
+            self._estimates[address] = (rtt, rtt / 2)
+        else:
+            srtt, rttvar = estimate
+            rttvar = 0.75 * rttvar + 0.25 * abs(srtt - rtt)
+            self._estimates[address] = (0.875 * srtt + 0.125 * rtt, rttvar)
+
+
+def create_prober(backend='auto', pacer=None):
+    """Crea el prober de sondeo; debe llamarse dentro del event loop que lo usará
+
+    Args:
+        backend (str, optional): 'icmp', 'subprocess' o 'auto'. Defaults to 'auto'.
+        pacer (TokenBucket, optional): Limitador de echo por segundo. Defaults to None.
+
+    Returns:
+        IcmpProber | SubprocessProber: Prober listo para usar
+    """
+    if backend == 'subprocess' or (backend == 'auto' and platform.system().lower() == 'windows'):
+        return SubprocessProber(pacer)
+
+    try:
+        return IcmpProber(pacer=pacer)
+    except OSError as exc:
+        if backend == 'icmp':
+            raise
+        log.warning('Native ICMP unavailable ({}), falling back to ping subprocesses'.format(exc))
+        return SubprocessProber(pacer)
@@ -1,21 +1,21 @@
 '''Aplicación web principal'''
 import os
 import sys
-import json
-import atexit
 import platform
+import ipaddress
+from urllib.parse import urlsplit
 
 import flask_login
 from flask import Blueprint, render_template, request, flash, redirect, url_for, send_from_directory
 from werkzeug.exceptions import HTTPException
 
 sys.path.append(os.path.dirname(os.path.realpath(__file__)) + '/../')
-from ipmon import db, app, scheduler, config
-from ipmon.api import get_web_themes, get_polling_config, get_active_theme
+from ipmon import db, app, config
+from ipmon.services import get_web_themes, get_polling_config, get_active_theme, invalidate_settings
 from ipmon.database import Polling, WebThemes
 from ipmon.forms import PollingConfigForm, UpdatePasswordForm, UpdateEmailForm
-from ipmon.polling import update_poll_scheduler, add_poll_history_cleanup_cron
-from ipmon.alerts import update_host_status_alert_schedule
+from ipmon.poller import start as start_poller
+from ipmon.push import issue_token
 from wtforms.validators import NumberRange
 
 main = Blueprint('main', __name__)
@@ -29,10 +29,11 @@ def webapp_init():
     for cls in HTTPException.__subclasses__():
         app.register_error_handler(cls, handle_error)
 
-    if not database_configured():
+    # Polling runs in the ipmon-poller process unless it is embedded in the web app
+    if not database_configured() or not config['Poller']['Embedded']:
         return
 
-    init_schedulers()
+    start_poller()
 
 
 #####################
@@ -66,18 +67,19 @@ def account():
 def set_theme():
     '''Seleccionar Tema'''
     if request.method == 'GET':
-        return render_template('setTheme.html', themes=json.loads(get_web_themes()))
+        return render_template('setTheme.html', themes=get_web_themes())
     elif request.method == 'POST':
         results = request.form.to_dict()
 
         try:
-            for theme in json.loads(get_web_themes()):
-                theme_obj = WebThemes.query.filter_by(id=int(theme['id'])).first()
+            for theme in get_web_themes():
+                theme_obj = WebThemes.query.filter_by(id=theme.id).first()
                 if theme_obj.id == int(results['id']):
                     theme_obj.active = True
                 else:
                     theme_obj.active = False
             db.session.commit()
+            invalidate_settings()
             flash('Tema actualizado correctamente', 'success')
         except Exception:
             flash('Error al actualizar el tema', 'danger')
@@ -90,7 +92,7 @@ def configure_polling():
     '''Intervalo de sondeo'''
     form = PollingConfigForm()
     if request.method == 'GET':
-        polling_config = json.loads(get_polling_config())
+        polling_config = get_polling_config()
         return render_template('pollingConfig.html', polling_config=polling_config, form=form)
     elif request.method == 'POST':
         if form.validate_on_submit():
@@ -101,15 +103,15 @@ def configure_polling():
                     polling_config.poll_interval = int(form.interval.data)
                 if form.retention_days.data:
                     polling_config.history_truncate_days = int(form.retention_days.data)
+                if form.max_probes_per_second.data:
+                    polling_config.max_probes_per_second = int(form.max_probes_per_second.data)
                 db.session.commit()
+                # The poller picks up the new interval from the settings version
+                invalidate_settings()
             except Exception:
                 flash('Error al actualizar el intervalo de sondeo', 'danger')
                 return redirect(url_for('main.configure_polling'))
 
-            # Update scheduled polling interval
-            if form.interval.data:
-                update_poll_scheduler(form.interval.data)
-
             flash('Intervalo de sondeo actualizado correctamente', 'success')
         else:
             for dummy, errors in form.errors.items():
@@ -132,14 +134,6 @@ def handle_error(error):
     return render_template('error.html', code=code, desc=desc)
 
 
-def init_schedulers():
-    # Register scheduler jobs
-    update_poll_scheduler(int(json.loads(get_polling_config())['poll_interval']))
-    update_host_status_alert_schedule(int(json.loads(get_polling_config())['poll_interval']) / 2)
-    add_poll_history_cleanup_cron()
-    atexit.register(scheduler.shutdown)
-
-
 ##########################
 # Custom Jinja Functions #
 ##########################
@@ -147,7 +141,7 @@ def get_active_theme_path():
     '''Get the file path for the active theme'''
     if not database_configured():
         return '/static/css/darkly.min.css'
-    return json.loads(get_active_theme())['theme_path']
+    return get_active_theme().theme_path
 app.add_template_global(get_active_theme_path, name='get_active_theme_path')
 
 
@@ -155,3 +149,29 @@ def database_configured():
     '''Checks to see if database is configured'''
     return os.path.exists(config['Database_Path'])
 app.add_template_global(database_configured, name='database_configured')
+
+
+def _is_loopback(host):
+    if host == 'localhost':
+        return True
+    try:
+        return ipaddress.ip_address(host).is_loopback
+    except ValueError:
+        return False
+
+
+def get_push_url():
+    '''URL of the Server-Sent Events channel with a token for the logged-in user, or None if browsers cannot reach it'''
+    if not config['Push']['Enabled'] or not flask_login.current_user.is_authenticated:
+        return None
+    url = config['Push']['Public_URL']
+    if not url:
+        if _is_loopback(config['Push']['Host']):
+            # Only reachable through a reverse proxy, which needs Public_URL
+            return None
+        hostname = urlsplit('//' + request.host).hostname
+        if ':' in hostname:
+            hostname = '[{}]'.format(hostname)
+        url = '//{}:{}/events'.format(hostname, config['Push']['Port'])
+    return '{}?token={}'.format(url, issue_token(flask_login.current_user.get_id()))
+app.add_template_global(get_push_url, name='get_push_url')
@@ -0,0 +1,214 @@
+'''Persistencia masiva de resultados de sondeo'''
+import os
+import sys
+import time
+
+from sqlalchemy import select, bindparam, func
+
+sys.path.append(os.path.dirname(os.path.realpath(__file__)) + '/../')
+from ipmon.database import Hosts, PollHistory, HostAlerts, HostStatusIntervals
+from ipmon.rollups import write_rollups
+
+_hosts = Hosts.__table__
+_intervals = HostStatusIntervals.__table__
+
+_UPDATE_HOST_STATUS = _hosts.update().where(_hosts.c.id == bindparam('b_id')).values(
+    previous_status=bindparam('b_previous_status'),
+    status=bindparam('b_status'),
+    last_poll=bindparam('b_last_poll')
+)
+
+_UPDATE_LAST_POLL = _hosts.update().where(_hosts.c.id == bindparam('b_id')).values(last_poll=bindparam('b_last_poll'))
+
+_EXTEND_INTERVAL = _intervals.update().where(
+    (_intervals.c.host_id == bindparam('b_host_id')) & (_intervals.c.start_time == bindparam('b_start_time'))
+).values(end_time=bindparam('b_end_time'))
+
+
+def write_poll_results(session, results):
+    """Escribe un lote de resultados con UPDATE e INSERT masivos en una sola transacción
+
+    Args:
+        session (Session): Sesión de SQLAlchemy
+        results (list): PollResult producidos por el ciclo de sondeo
+
+    Returns:
+        int: Número de hosts actualizados
+    """
+    # Skips hosts deleted while the cycle was running
+    existing = _existing_ids(session, results)
+
+    host_rows = []
+    history_rows = []
+    alert_rows = []
+    for target, previous_status, status, poll_time, probe, dummy in results:
+        if target.id not in existing:
+            continue
+
+        host_rows.append({
+            'b_id': target.id,
+            'b_previous_status': previous_status,
+            'b_status': status,
+            'b_last_poll': poll_time
+        })
+        history_row = {
+            'host_id': target.id,
+            'poll_time': poll_time,
+            'poll_status': status
+        }
+        history_row.update(_probe_stats(probe))
+        history_rows.append(history_row)
+        if target.alerts_enabled and previous_status != status:
+            # Create alert if status changed
+            alert_rows.append(_alert_row(target, status, poll_time))
+
+    if host_rows:
+        session.execute(_UPDATE_HOST_STATUS, host_rows)
+        session.execute(PollHistory.__table__.insert(), history_rows)
+    if alert_rows:
+        session.execute(HostAlerts.__table__.insert(), alert_rows)
+    write_rollups(session, [result for result in results if result.target.id in existing])
+    session.commit()
+
+    return len(host_rows)
+
+
+def _existing_ids(session, results):
+    '''IDs de los hosts de `results` que siguen en la tabla hosts, con un SELECT por cada 1000'''
+    host_ids = sorted({result.target.id for result in results})
+    existing = set()
+    for i in range(0, len(host_ids), 1000):
+        existing.update(session.execute(select(_hosts.c.id).where(_hosts.c.id.in_(host_ids[i:i + 1000]))).scalars())
+    return existing
+
+
+def _micros(milliseconds):
+    return None if milliseconds is None else int(round(milliseconds * 1000))
+
+
+def _probe_stats(probe):
+    '''Columnas numéricas de RTT (microsegundos) y pérdida (%) de una sonda'''
+    if probe is None:
+        return {'rtt_min_us': None, 'rtt_avg_us': None, 'rtt_max_us': None, 'jitter_us': None, 'loss_pct': None}
+    return {
+        'rtt_min_us': _micros(probe.rtt_min),
+        'rtt_avg_us': _micros(probe.rtt),
+        'rtt_max_us': _micros(probe.rtt_max),
+        'jitter_us': _micros(probe.jitter),
+        'loss_pct': probe.loss
+    }
+
+
+def _alert_row(target, status, poll_time):
+    return {
+        'host_id': target.id,
+        'hostname': target.hostname,
+        'ip_address': target.ip_address,
+        'host_status': status,
+        'poll_time': poll_time
+    }
+
+
+class StatusIntervalWriter():
+    '''Persistencia por cambios de estado: un intervalo (host, estado, inicio, fin) por racha de sondeos iguales'''
+
+    def __init__(self, flush_window=300):
+        self.flush_window = flush_window
+        # host_id -> [status, start_time, last_seen, extended_at]
+        self._open = None
+
+    def write(self, session, results):
+        """Escribe un lote de resultados tocando solo los hosts que cambiaron de estado
+
+        Los hosts sin cambios solo extienden el fin de su intervalo abierto y su último sondeo en la
+        tabla hosts, como mucho una vez por `flush_window` segundos.
+
+        Args:
+            session (Session): Sesión de SQLAlchemy
+            results (list): PollResult producidos por el ciclo de sondeo
+
+        Returns:
+            int: Número de hosts que cambiaron de estado
+        """
+        existing = _existing_ids(session, results)
+        if self._open is None:
+            self._open = self._load_open_intervals(session)
+        for result in results:
+            if result.target.id not in existing:
+                self._open.pop(result.target.id, None)
+
+        now = time.monotonic()
+        host_rows = []
+        new_rows = []
+        end_rows = []
+        alert_rows = []
+        for target, previous_status, status, poll_time, dummy, dummy in results:
+            if target.id not in existing:
+                continue
+
+            interval = self._open.get(target.id)
+            if interval is not None and interval[0] == status:
+                interval[2] = poll_time
+                if now - interval[3] >= self.flush_window:
+                    end_rows.append({'b_host_id': target.id, 'b_start_time': interval[1], 'b_end_time': poll_time})
+                    # Web workers read last_poll from the database
+                    host_rows.append({
+                        'b_id': target.id,
+                        'b_previous_status': previous_status,
+                        'b_status': status,
+                        'b_last_poll': poll_time
+                    })
+                    interval[3] = now
+                continue
+
+            if interval is not None:
+                # Close the previous run at the last poll that still saw the old status
+                end_rows.append({'b_host_id': target.id, 'b_start_time': interval[1], 'b_end_time': interval[2]})
+            new_rows.append({'host_id': target.id, 'status': status, 'start_time': poll_time, 'end_time': poll_time})
+            self._open[target.id] = [status, poll_time, poll_time, now]
+
+            host_rows.append({
+                'b_id': target.id,
+                'b_previous_status': previous_status,
+                'b_status': status,
+                'b_last_poll': poll_time
+            })
+            if target.alerts_enabled and previous_status != status:
+                alert_rows.append(_alert_row(target, status, poll_time))
+
+        if end_rows:
+            session.execute(_EXTEND_INTERVAL, end_rows)
+        if new_rows:
+            session.execute(_intervals.insert(), new_rows)
+        if host_rows:
+            session.execute(_UPDATE_HOST_STATUS, host_rows)
+        if alert_rows:
+            session.execute(HostAlerts.__table__.insert(), alert_rows)
+        # No rollups here: upserting them for every poll would undo writing only on change, and
+        # availability in this mode is computed from the intervals
+        session.commit()
+
+        return len(new_rows)
+
+    def flush_ends(self, session):
+        '''Escribe el último sondeo visto como fin de cada intervalo abierto y como last_poll del host; usar al detener el escritor'''
+        if not self._open:
+            return
+        session.execute(_EXTEND_INTERVAL, [
+            {'b_host_id': host_id, 'b_start_time': interval[1], 'b_end_time': interval[2]}
+            for host_id, interval in self._open.items()
+        ])
+        session.execute(_UPDATE_LAST_POLL, [
+            {'b_id': host_id, 'b_last_poll': interval[2]}
+            for host_id, interval in self._open.items()
+        ])
+        session.commit()
+
+    def _load_open_intervals(self, session):
+        latest = select(func.max(_intervals.c.id)).group_by(_intervals.c.host_id)
+        rows = session.execute(
+            select(_intervals.c.host_id, _intervals.c.status, _intervals.c.start_time, _intervals.c.end_time)
+            .where(_intervals.c.id.in_(latest))
+        ).all()
+        now = time.monotonic()
+        return {row.host_id: [row.status, row.start_time, row.end_time, now] for row in rows}
@@ -0,0 +1,135 @@
+'''Proceso de sondeo: sondeo de hosts, alertas, limpieza del historial y canal push
+
+La aplicación web no ejecuta trabajos en segundo plano; este proceso es el único que sondea, así
+los workers web pueden escalar sin multiplicar las sondas. Se ejecuta una sola instancia:
+
+    ipmon-poller
+
+Los cambios de configuración y de hosts hechos desde la web llegan por settingsVersion; las
+métricas del escritor y del canal push vuelven a la web por config['Poller']['Metrics_Path'].
+Con config['Poller']['Embedded'] la aplicación web lo inicia dentro de su propio proceso.
+'''
+import os
+import sys
+import json
+import time
+import atexit
+import signal
+import threading
+
+sys.path.append(os.path.dirname(os.path.realpath(__file__)) + '/../')
+from ipmon import app, scheduler, config, log
+from ipmon.services import get_polling_config
+from ipmon.polling import update_poll_scheduler, add_poll_history_cleanup_cron
+from ipmon.alerts import update_host_status_alert_schedule
+from ipmon.writer import result_writer
+from ipmon.push import push_hub
+from ipmon.status import live_status
+from ipmon.targets import probe_targets
+
+_poll_interval = None
+
+
+def start():
+    '''Registra los trabajos del scheduler y lo inicia junto con el escritor y el canal push; requiere app context'''
+    if scheduler.running:
+        return
+
+    # This process keeps the live status table current, so it only reloads it on host edits
+    probe_targets.ttl = config['Target_Cache_TTL']
+    _reschedule(get_polling_config().poll_interval)
+    add_poll_history_cleanup_cron()
+    scheduler.add_job(
+        id='Settings Watch', func=_watch_settings, trigger='interval',
+        seconds=config['Settings_Cache']['Check_Interval'], max_instances=1
+    )
+    scheduler.add_job(
+        id='Publish Metrics', func=_publish_metrics, trigger='interval',
+        seconds=config['Poller']['Metrics_Interval'], max_instances=1
+    )
+    if config['Push']['Enabled']:
+        live_status.subscribe(push_hub.on_status)
+        push_hub.start()
+    result_writer.start()
+    scheduler.start()
+    _publish_metrics()
+    atexit.register(result_writer.stop)
+    atexit.register(scheduler.shutdown)
+
+
+def _reschedule(poll_interval):
+    global _poll_interval
+
+    update_poll_scheduler(poll_interval)
+    update_host_status_alert_schedule(poll_interval / 2)
+    _poll_interval = poll_interval
+
+
+def _watch_settings():
+    '''Aplica el intervalo de sondeo guardado desde la web'''
+    with app.app_context():
+        poll_interval = get_polling_config().poll_interval
+    if poll_interval != _poll_interval:
+        log.info('Poll interval changed to {} seconds'.format(poll_interval))
+        _reschedule(poll_interval)
+
+
+def _publish_metrics():
+    '''Escribe las métricas del escritor y del canal push para los workers web'''
+    path = config['Poller']['Metrics_Path']
+    metrics = {'updated': time.time(), 'writer': result_writer.metrics(), 'push': push_hub.metrics()}
+    try:
+        with open(path + '.tmp', 'w') as f:
+            json.dump(metrics, f)
+        os.replace(path + '.tmp', path)
+    except OSError as exc:
+        log.error('Failed to publish poller metrics: {}'.format(exc))
+
+
+def get_metrics(name):
+    """Métricas `name` ('writer' o 'push') del proceso de sondeo
+
+    Args:
+        name (str): Componente
+
+    Returns:
+        dict: Métricas con `updated` (segundos epoch de la publicación), o None si el proceso de
+            sondeo aún no las publicó
+    """
+    if scheduler.running:
+        # Polling runs in this process
+        metrics = {'writer': result_writer.metrics, 'push': push_hub.metrics}[name]()
+        metrics['updated'] = time.time()
+        return metrics
+    try:
+        with open(config['Poller']['Metrics_Path']) as f:
+            published = json.load(f)
+    except (OSError, ValueError):
+        return None
+    metrics = published[name]
+    metrics['updated'] = published['updated']
+    return metrics
+
+
+def main():
+    '''Punto de entrada de ipmon-poller'''
+    if not os.path.exists(config['Database_Path']):
+        log.error('Database not found at {}; complete the web setup first'.format(config['Database_Path']))
+        return 1
+
+    with app.app_context():
+        start()
+    log.info('Poller started')
+
+    stop = threading.Event()
+    signal.signal(signal.SIGTERM, lambda signum, frame: stop.set())
+    try:
+        stop.wait()
+    except KeyboardInterrupt:
+        pass
+    log.info('Poller stopping')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -1,52 +1,84 @@
 '''Biblioteca de sondeo del host'''
 import os
 import sys
-import platform
-import subprocess
 import socket
 import time
-import json
+import asyncio
+import threading
 
-from multiprocessing.pool import ThreadPool
-from datetime import date, timedelta
+from datetime import datetime
 
 sys.path.append(os.path.dirname(os.path.realpath(__file__)) + '/../')
-from ipmon import app, db, scheduler, log, config
-from ipmon.database import Hosts, PollHistory, HostAlerts
-from ipmon.api import get_all_hosts, get_host, get_polling_config, get_poll_history
-
-
-def poll_host(host, new_host=False, count=3):
+from ipmon import app, scheduler, log, config
+from ipmon.icmp import create_prober, RttEstimator, ProbeResult
+from ipmon.ratelimit import TokenBucket
+from ipmon.schedule import PollSchedule
+from ipmon.services import get_polling_config
+from ipmon.writer import result_writer
+from ipmon.retention import purge_history
+from ipmon.targets import probe_targets, PollResult
+
+_probe_loop = None
+_prober = None
+_pacer = TokenBucket()
+_schedule = PollSchedule()
+_rtt = RttEstimator(config['Probe_Strategy']['Min_Timeout'], config['Probe_Strategy']['Max_Timeout'])
+_capacity_warning = None
+_prober_lock = threading.Lock()
+
+
+def poll_host(host, new_host=False, count=None):
     """Hacer sondeo al host vía ping ICMP para verificar si está activo/inactivo"""
     hostname = None
-
-    if platform.system().lower() == 'windows':
-        command = ['ping', '-n', str(count), '-w', '1000', host]  # timeout 1 seg
-    else:
-        command = ['ping', '-c', str(count), '-W', '1', host]
+    loop, prober = get_prober()
 
     try:
-        # Capturamos salida para analizarla
-        response = subprocess.run(
-            command,
-            capture_output=True,
-            text=True
-        )
+        result = asyncio.run_coroutine_threadsafe(_probe(prober, host, count), loop).result()
+        status = result.status
+    except Exception as exc:
+        log.error('Failed to poll {}: {}'.format(host, exc))
+        status = 'Down'
+
+    if new_host:
+        hostname = get_hostname(host)
+
+    return (status, datetime.now().replace(microsecond=0), hostname)
 
-        salida = response.stdout.lower()
 
-        if platform.system().lower() == 'windows':
-            exito = "ttl=" in salida
-        else:
-            exito = (response.returncode == 0)
+def get_prober():
+    '''Devuelve el event loop de sondeo y su prober compartido, iniciándolos la primera vez'''
+    global _probe_loop, _prober
 
-        if new_host:
-            hostname = get_hostname(host)
+    with _prober_lock:
+        if _prober is None:
+            loop = asyncio.new_event_loop()
+            threading.Thread(target=loop.run_forever, name='IPMON Probe Loop', daemon=True).start()
+            _prober = asyncio.run_coroutine_threadsafe(_create_prober(), loop).result()
+            _probe_loop = loop
 
-        return ('Up' if exito else 'Down', time.strftime('%Y-%m-%d %T'), hostname)
+    return _probe_loop, _prober
+
+
+async def _probe(prober, address, count=None):
+    '''Sondea una dirección con la estrategia de config['Probe_Strategy']'''
+    strategy = config['Probe_Strategy']
+    result = await prober.ping(
+        address,
+        count=count or strategy['Count'],
+        timeout=_rtt.timeout(address) if strategy['Fast_Fail'] else strategy['Max_Timeout'],
+        fast=strategy['Fast_Fail'],
+        max_timeout=strategy['Max_Timeout']
+    )
+    _rtt.update(address, result.rtt)
+    if result.status == 'Up' and result.jitter is None:
+        # Single-echo probes take the jitter between this and previous probes
+        result = result._replace(jitter=_rtt.jitter(address))
+    return result
+
+
+async def _create_prober():
+    return create_prober(config['Ping_Backend'], pacer=_pacer)
 
-    except Exception as e:
-        return ('Down', time.strftime('%Y-%m-%d %T'), hostname)
 
 def update_poll_scheduler(poll_interval):
     '''Actualiza la programación de sondeo de hosts mediante APScheduler'''
@@ -56,7 +88,18 @@ def update_poll_scheduler(poll_interval):
     except Exception:
         pass
 
-    scheduler.add_job(id='Poll Hosts', func=_poll_hosts_threaded, trigger='interval', seconds=int(poll_interval), max_instances=1)
+    adaptive = config['Adaptive_Polling']
+    _schedule.configure(
+        int(poll_interval),
+        min_interval=adaptive['Min_Interval'],
+        max_backoff=adaptive['Max_Backoff'],
+        stable_polls=adaptive['Stable_Polls'],
+        adaptive=adaptive['Enabled']
+    )
+
+    # The job only wakes up to poll the hosts that are due, so it ticks faster than any host interval
+    tick = min(adaptive['Tick'], int(poll_interval))
+    scheduler.add_job(id='Poll Hosts', func=_poll_hosts, trigger='interval', seconds=tick, max_instances=1)
 
 
 def add_poll_history_cleanup_cron():
@@ -75,103 +118,71 @@ def get_hostname(ip_address):
 
 
 
-def _poll_hosts_threaded():
-    log.debug('Starting host polling')
+def _poll_hosts():
+    '''Sondea los hosts vencidos; el hilo escritor persiste los resultados a medida que llegan'''
+    global _capacity_warning
+
     s = time.perf_counter()
+    loop, prober = get_prober()
 
-    from math import ceil
-    import time as t
+    with app.app_context():
+        polling_config = get_polling_config()
+        all_hosts = probe_targets.get()
 
-    def chunk_list(lst, n):
-        for i in range(0, len(lst), n):
-            yield lst[i:i + n]
+        _pacer.configure(polling_config.max_probes_per_second)
+        capacity = (polling_config.max_probes_per_second, len(all_hosts), polling_config.poll_interval)
+        echoes = 1 if config['Probe_Strategy']['Fast_Fail'] else config['Probe_Strategy']['Count']
+        if _pacer.rate and len(all_hosts) * echoes / _pacer.rate > polling_config.poll_interval:
+            if capacity != _capacity_warning:
+                log.warning('{} probes/s cannot poll {} hosts within the {} second poll interval'.format(*capacity))
+                _capacity_warning = capacity
 
-    MAX_BATCH_SIZE = 50  # Número de IPs a la vez
-    WAIT_BETWEEN_BATCHES = 1  # Segundos de espera
+        now = time.monotonic()
+        _schedule.sync([host.id for host in all_hosts], now)
+        due = set(_schedule.pop_due(now))
+        due_hosts = [host for host in all_hosts if host.id in due]
+        if not due_hosts:
+            return
 
-    with app.app_context():
-        all_hosts = json.loads(get_all_hosts())
-        batches = list(chunk_list(all_hosts, MAX_BATCH_SIZE))
+        log.debug('Starting host polling for {} of {} hosts'.format(len(due_hosts), len(all_hosts)))
 
-        for i, batch in enumerate(batches):
-            pool = ThreadPool(min(len(batch), config['Max_Threads']))
-            threads = []
+    asyncio.run_coroutine_threadsafe(_probe_hosts(prober, due_hosts), loop).result()
 
-            for host in batch:
-                threads.append(
-                    pool.apply_async(_poll_host_task, (host['id'],))
-                )
-
-            pool.close()
-            pool.join()
+    log.debug("Host polling finished executing in {} seconds.".format(time.perf_counter() - s))
 
-            for thread in threads:
-                host_info, new_poll_history, host_alert = thread.get()
-                host = Hosts.query.filter_by(id=int(host_info['id'])).first()
-                host.previous_status = host_info['previous_status']
-                host.status = host_info['status']
-                host.last_poll = host_info['last_poll']
-                db.session.add(new_poll_history)
-                if host_alert:
-                    db.session.add(host_alert)
 
-            db.session.commit()
+async def _probe_hosts(prober, hosts):
+    '''Sondea todos los hosts bajo un único límite de concurrencia y encola cada resultado para el escritor'''
+    semaphore = asyncio.Semaphore(config['Max_Concurrent_Probes'])
 
-            if i < len(batches) - 1:
-                log.debug(f"Esperando {WAIT_BETWEEN_BATCHES}s antes de siguiente lote...")
-                t.sleep(WAIT_BETWEEN_BATCHES)
+    async def probe(host):
+        async with semaphore:
+            try:
+                probe_result = await _probe(prober, host.ip_address)
+            except Exception as exc:
+                log.error('Failed to poll {}: {}'.format(host.ip_address, exc))
+                probe_result = ProbeResult('Down')
 
-    log.debug("Host polling finished executing in {} seconds.".format(time.perf_counter() - s))
+        status = probe_result.status
+        poll_time = datetime.now().replace(microsecond=0)
+        previous_status, previous_poll = probe_targets.transition(host.id, status, poll_time)
+        _schedule.record(host.id, status, previous_status != status, time.monotonic())
 
+        # Adaptive polling spaces polls unevenly, so each one weighs the time since the previous one
+        elapsed = int((poll_time - previous_poll).total_seconds()) if isinstance(previous_poll, datetime) else None
+        result = PollResult(host, previous_status, status, poll_time, probe_result, elapsed)
+        while not result_writer.put(result):
+            # Back-pressure: the writer buffer is full, wait for it to drain
+            await asyncio.sleep(0.05)
 
-def _poll_host_task(host_id):
-    with app.app_context():
-        host_info = json.loads(get_host(int(host_id)))
-        status, poll_time, hostname = poll_host(host_info['ip_address'])
-        host_alert = None
-
-        # Update host status
-        host_info['previous_status'] = host_info['status']
-        host_info['status'] = status
-        host_info['last_poll'] = poll_time
-
-        # Add poll history for host
-        if hostname:
-            host_info['hostname'] = hostname
-
-        new_poll_history = PollHistory(
-            host_id=host_info['id'],
-            poll_time=poll_time,
-            poll_status=status
-        )
-
-        log.info('{} - {}'.format(host_info['alerts_enabled'], type(host_info['alerts_enabled'])))
-        if host_info['alerts_enabled'] and host_info['previous_status'] != status:
-            # Create alert if status changed
-            host_alert = HostAlerts(
-                host_id=host_info['id'],
-                hostname=host_info['hostname'],
-                ip_address=host_info['ip_address'],
-                host_status=host_info['status'],
-                poll_time=host_info['last_poll']
-            )
-
-    return host_info, new_poll_history, host_alert
+    await asyncio.gather(*[probe(host) for host in hosts])
 
 
 def _poll_history_cleanup_task():
     log.debug('Starting poll history cleanup')
-    s = time.perf_counter()
 
     with app.app_context():
-        retention_days = json.loads(get_polling_config())['history_truncate_days']
-        current_date = date.today()
-
-        # Delete poll history where date_created < today - retention_days
-        PollHistory.query.filter(
-            PollHistory.date_created < (current_date - timedelta(days=retention_days))
-        ).delete()
-
-        db.session.commit()
+        retention_days = get_polling_config().history_truncate_days
 
-    log.debug("Poll history cleanup finished executing in {} seconds.".format(time.perf_counter() - s))
+    # Delete history older than today - retention_days, one bounded chunk at a time
+    purge_history(retention_days)
@@ -0,0 +1,221 @@
+'''Canal Server-Sent Events con los cambios de estado de los hosts
+
+Un único hilo con un event loop de asyncio atiende a todos los clientes: cada conexión es una
+corrutina con su propio buffer acotado, no un hilo.
+'''
+import os
+import sys
+import asyncio
+import threading
+
+from urllib.parse import urlsplit, parse_qs
+from itsdangerous import URLSafeTimedSerializer, BadData
+
+sys.path.append(os.path.dirname(os.path.realpath(__file__)) + '/../')
+from ipmon import app, config, log
+from ipmon.serialize import dumps
+
+_HEADERS = (
+    'HTTP/1.1 200 OK\r\n'
+    'Content-Type: text/event-stream\r\n'
+    'Cache-Control: no-cache\r\n'
+    'Connection: keep-alive\r\n'
+    'X-Accel-Buffering: no\r\n'
+)
+_NOT_FOUND = b'HTTP/1.1 404 Not Found\r\nContent-Length: 0\r\nConnection: close\r\n\r\n'
+_FORBIDDEN = b'HTTP/1.1 403 Forbidden\r\nContent-Length: 0\r\nConnection: close\r\n\r\n'
+_BUSY = b'HTTP/1.1 503 Service Unavailable\r\nContent-Length: 0\r\nConnection: close\r\n\r\n'
+_HEARTBEAT = b': ping\n\n'
+_RESET = b'event: reset\ndata: {}\n\n'
+
+
+def _serializer():
+    # Both processes derive the secret key from the same machine, see ipmon/__init__.py
+    return URLSafeTimedSerializer(app.secret_key, salt='push-events')
+
+
+def issue_token(user_id):
+    '''Token firmado que autoriza a un usuario autenticado a abrir el canal'''
+    return _serializer().dumps(user_id)
+
+
+def valid_token(token, max_age):
+    '''Indica si `token` lo emitió la aplicación web hace menos de `max_age` segundos'''
+    if not token:
+        return False
+    try:
+        _serializer().loads(token, max_age=max_age)
+    except BadData:
+        return False
+    return True
+
+
+def _event(name, data, event_id=None):
+    '''Codifica un evento SSE una sola vez para todos los clientes'''
+    lines = 'event: {}\n'.format(name)
+    if event_id is not None:
+        lines += 'id: {}\n'.format(event_id)
+    return lines.encode() + b'data: ' + dumps(data) + b'\n\n'
+
+
+class PushHub():
+    '''Servidor SSE en su propio hilo; `publish` se puede llamar desde cualquier hilo'''
+
+    def __init__(self, host='127.0.0.1', port=5001, queue_size=256, heartbeat=15, max_clients=1000,
+                 allowed_origins=(), token_max_age=86400):
+        self.host = host
+        self.port = port
+        self.allowed_origins = frozenset(allowed_origins)
+        self.token_max_age = token_max_age
+        self.queue_size = queue_size
+        self.heartbeat = heartbeat
+        self.max_clients = max_clients
+        self._loop = None
+        self._thread = None
+        self._clients = set()
+        # Clients with a pending reset; they resync from /hosts/changes, so skip events until then
+        self._stale = set()
+        self._counts = None
+        self._lock = threading.Lock()
+        self._stats = {'connected': 0, 'dropped_slow': 0, 'rejected_busy': 0, 'rejected_token': 0}
+
+    def start(self):
+        '''Inicia el servidor si aún no está corriendo'''
+        with self._lock:
+            if self._thread is not None:
+                return
+            ready = threading.Event()
+            self._thread = threading.Thread(target=self._run, args=(ready,), name='IPMON Push', daemon=True)
+            self._thread.start()
+        ready.wait(5)
+
+    def publish(self, name, data, event_id=None):
+        '''Envía un evento a todos los clientes conectados'''
+        if self._loop is not None:
+            self._loop.call_soon_threadsafe(self._fanout, _event(name, data, event_id))
+
+    def on_status(self, event, data, counts):
+        '''Listener de live_status: reenvía transiciones y recargas, y los conteos agrupados'''
+        self.publish(event, data, data['version'])
+        self.publish_counts(counts)
+
+    def publish_counts(self, counts):
+        '''Publica los conteos como mucho una vez por segundo; solo se envía el último valor'''
+        self._counts = counts
+
+    def metrics(self):
+        '''Clientes conectados y desconexiones por buffer lleno'''
+        metrics = dict(self._stats)
+        metrics['clients'] = len(self._clients)
+        return metrics
+
+    def _run(self, ready):
+        self._loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(self._loop)
+        try:
+            server = self._loop.run_until_complete(asyncio.start_server(self._serve, self.host, self.port))
+        except OSError as exc:
+            log.error('Push channel could not listen on {}:{}: {}'.format(self.host, self.port, exc))
+            self._loop = None
+            ready.set()
+            return
+        log.info('Push channel listening on {}:{}'.format(self.host, self.port))
+        self._loop.create_task(self._flush_counts())
+        ready.set()
+        try:
+            self._loop.run_forever()
+        finally:
+            server.close()
+
+    def _fanout(self, payload):
+        for queue in list(self._clients):
+            if queue in self._stale:
+                continue
+            try:
+                queue.put_nowait(payload)
+            except asyncio.QueueFull:
+                # Slow client: drop its backlog and tell it to resync from /hosts/changes
+                while not queue.empty():
+                    queue.get_nowait()
+                queue.put_nowait(_RESET)
+                self._stale.add(queue)
+                self._stats['dropped_slow'] += 1
+
+    async def _flush_counts(self):
+        sent = None
+        while True:
+            await asyncio.sleep(1)
+            counts = self._counts
+            if counts is not None and counts != sent:
+                self._fanout(_event('counts', counts))
+                sent = counts
+
+    async def _serve(self, reader, writer):
+        origin = None
+        try:
+            request_line = await asyncio.wait_for(reader.readline(), 10)
+            while True:
+                line = (await asyncio.wait_for(reader.readline(), 10)).strip()
+                if not line:
+                    break
+                name, dummy, value = line.decode('latin-1').partition(':')
+                if name.strip().lower() == 'origin':
+                    origin = value.strip()
+        except (asyncio.TimeoutError, ConnectionError):
+            writer.close()
+            return
+
+        parts = request_line.decode('latin-1').split()
+        target = urlsplit(parts[1]) if len(parts) >= 2 else None
+        if target is None or parts[0] != 'GET' or target.path != '/events':
+            writer.write(_NOT_FOUND)
+            writer.close()
+            return
+        if not valid_token(parse_qs(target.query).get('token', [None])[0], self.token_max_age):
+            self._stats['rejected_token'] += 1
+            writer.write(_FORBIDDEN)
+            writer.close()
+            return
+        if len(self._clients) >= self.max_clients:
+            self._stats['rejected_busy'] += 1
+            writer.write(_BUSY)
+            writer.close()
+            return
+
+        queue = asyncio.Queue(self.queue_size)
+        self._clients.add(queue)
+        self._stats['connected'] += 1
+        headers = _HEADERS
+        if origin in self.allowed_origins:
+            headers += 'Access-Control-Allow-Origin: {}\r\nVary: Origin\r\n'.format(origin)
+        try:
+            writer.write((headers + '\r\nretry: 5000\n\n').encode())
+            if self._counts is not None:
+                writer.write(_event('counts', self._counts))
+            await writer.drain()
+            while True:
+                try:
+                    payload = await asyncio.wait_for(queue.get(), self.heartbeat)
+                    if payload is _RESET:
+                        self._stale.discard(queue)
+                except asyncio.TimeoutError:
+                    payload = _HEARTBEAT
+                writer.write(payload)
+                await asyncio.wait_for(writer.drain(), self.heartbeat)
+        except (asyncio.TimeoutError, ConnectionError):
+            pass
+        finally:
+            self._clients.discard(queue)
+            self._stale.discard(queue)
+            writer.close()
+
+
+push_hub = PushHub(
+    host=config['Push']['Host'],
+    port=config['Push']['Port'],
+    queue_size=config['Push']['Queue_Size'],
+    heartbeat=config['Push']['Heartbeat'],
+    max_clients=config['Push']['Max_Clients'],
+    allowed_origins=config['Push']['Allowed_Origins'],
+    token_max_age=config['Push']['Token_Max_Age']
+)
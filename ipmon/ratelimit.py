@@ -0,0 +1,38 @@
+'''Limitador de sondas por segundo'''
+import time
+import asyncio
+
+
+class TokenBucket():
+    '''Token bucket para asyncio que reparte las sondas uniformemente en el tiempo'''
+
+    def __init__(self, rate=0, burst=None):
+        self.rate = 0
+        self.burst = 1
+        self.configure(rate, burst)
+        self._tokens = self.burst
+        self._updated = time.monotonic()
+
+    def configure(self, rate, burst=None):
+        """Actualiza la tasa permitida
+
+        Args:
+            rate (float): Sondas por segundo; 0 desactiva el límite
+            burst (float, optional): Sondas que pueden salir de golpe. Defaults to 1/20 de segundo de tasa.
+        """
+        self.rate = max(0.0, float(rate or 0))
+        self.burst = burst if burst else max(1.0, self.rate / 20)
+
+    async def acquire(self, tokens=1):
+        '''Espera hasta que haya `tokens` disponibles'''
+        if not self.rate:
+            return
+
+        now = time.monotonic()
+        self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+        # Reserve the tokens up front so concurrent callers queue up behind each other
+        self._tokens -= tokens
+        if self._tokens < 0:
+            await asyncio.sleep(-self._tokens / self.rate)
@@ -0,0 +1,106 @@
+'''Limpieza del historial por lotes acotados'''
+import os
+import sys
+import time
+
+from datetime import date, datetime, timedelta, time as day_time
+from sqlalchemy import select
+
+sys.path.append(os.path.dirname(os.path.realpath(__file__)) + '/../')
+from ipmon import app, db, config, log
+from ipmon.archive import archive_day, archived_days, purge_archive
+from ipmon.database import PollHistory, HostStatusIntervals, HostRollupsHourly, HostRollupsDaily, RetentionRuns
+from ipmon.writer import result_writer
+
+
+def _delete_chunk(table, column, cutoff, chunk_size):
+    '''Borra como mucho `chunk_size` filas con `column < cutoff` y hace commit'''
+    # The subquery walks the index on `column`; the outer DELETE hits the primary key
+    ids = select(table.c.id).where(column < cutoff).limit(chunk_size).scalar_subquery()
+    deleted = db.session.execute(table.delete().where(table.c.id.in_(ids))).rowcount
+    db.session.commit()
+    return deleted
+
+
+def _archive_expired(cutoff):
+    '''Archiva cada día con historial anterior a `cutoff` que aún no tenga archivo'''
+    archived = 0
+    with app.app_context():
+        days = db.session.execute(
+            select(PollHistory.date_created).where(PollHistory.date_created < cutoff).distinct()
+        ).scalars().all()
+        done = set(archived_days())
+        for day in sorted(days):
+            if day not in done:
+                archived += archive_day(db.session, day)
+        db.session.rollback()
+    return archived
+
+
+def _record_run(run):
+    db.session.execute(RetentionRuns.__table__.insert(), [run])
+    db.session.commit()
+
+
+def purge_history(retention_days):
+    """Borra el historial anterior a `retention_days` días en lotes de config['Retention']['Chunk_Size'] filas
+
+    Cada lote es una transacción corta en el hilo escritor, así los resultados de sondeo encolados se
+    escriben entre lote y lote en lugar de esperar a que termine toda la limpieza. Con
+    config['Archive']['Enabled'] el historial se copia antes al archivo columnar de cada día.
+
+    Args:
+        retention_days (int): Días de historial a conservar
+
+    Returns:
+        dict: Fila registrada en retentionRuns
+    """
+    s = time.perf_counter()
+    chunk_size = config['Retention']['Chunk_Size']
+    pause = config['Retention']['Chunk_Pause']
+    today = date.today()
+    cutoff = today - timedelta(days=retention_days)
+    rollup_retention = config['Rollup_Retention_Days']
+
+    targets = [
+        (PollHistory.__table__, PollHistory.date_created, cutoff),
+        (HostStatusIntervals.__table__, HostStatusIntervals.end_time, datetime.combine(cutoff, day_time.min)),
+        # Rollups outlive the raw history they summarize
+        (
+            HostRollupsHourly.__table__,
+            HostRollupsHourly.period_start,
+            (today - timedelta(days=rollup_retention['Hourly'])).strftime('%Y-%m-%d')
+        ),
+        (
+            HostRollupsDaily.__table__,
+            HostRollupsDaily.period_start,
+            (today - timedelta(days=rollup_retention['Daily'])).strftime('%Y-%m-%d')
+        )
+    ]
+
+    if config['Archive']['Enabled']:
+        archived = _archive_expired(cutoff)
+        removed = purge_archive(today - timedelta(days=config['Archive']['Retention_Days']))
+        log.info('Archived {} poll history rows; removed {} expired archive files'.format(archived, removed))
+
+    rows_deleted = 0
+    chunks = 0
+    for table, column, table_cutoff in targets:
+        while True:
+            deleted = result_writer.submit(_delete_chunk, table, column, table_cutoff, chunk_size).result()
+            rows_deleted += deleted
+            chunks += 1
+            if deleted < chunk_size:
+                break
+            time.sleep(pause)
+
+    run = {
+        'run_time': time.strftime('%Y-%m-%d %T'),
+        'cutoff': cutoff.strftime('%Y-%m-%d'),
+        'rows_deleted': rows_deleted,
+        'chunks': chunks,
+        'seconds': time.perf_counter() - s
+    }
+    result_writer.submit(_record_run, run).result()
+    log.info('Retention deleted {} rows in {} chunks ({:.2f} seconds)'.format(rows_deleted, chunks, run['seconds']))
+    return run
@@ -0,0 +1,108 @@
+'''Agregados por hora y por día del sondeo de cada host (solo en el modo de historial polls)'''
+import os
+import sys
+
+from sqlalchemy import func
+from sqlalchemy.dialects.sqlite import insert
+
+sys.path.append(os.path.dirname(os.path.realpath(__file__)) + '/../')
+from ipmon.database import HostRollupsHourly, HostRollupsDaily
+
+
+def _upsert(table):
+    stmt = insert(table)
+    excluded = stmt.excluded
+    return stmt.on_conflict_do_update(
+        index_elements=['host_id', 'period_start'],
+        set_={
+            'poll_count': table.c.poll_count + excluded.poll_count,
+            'up_count': table.c.up_count + excluded.up_count,
+            'seconds': table.c.seconds + excluded.seconds,
+            'up_seconds': table.c.up_seconds + excluded.up_seconds,
+            'transitions': table.c.transitions + excluded.transitions,
+            'rtt_count': table.c.rtt_count + excluded.rtt_count,
+            'rtt_sum_us': table.c.rtt_sum_us + excluded.rtt_sum_us,
+            # SQLite's scalar min()/max() return NULL if any argument is NULL
+            'rtt_min_us': func.min(
+                func.coalesce(table.c.rtt_min_us, excluded.rtt_min_us),
+                func.coalesce(excluded.rtt_min_us, table.c.rtt_min_us)
+            ),
+            'rtt_max_us': func.max(
+                func.coalesce(table.c.rtt_max_us, excluded.rtt_max_us),
+                func.coalesce(excluded.rtt_max_us, table.c.rtt_max_us)
+            )
+        }
+    )
+
+
+_UPSERT_HOURLY = _upsert(HostRollupsHourly.__table__)
+_UPSERT_DAILY = _upsert(HostRollupsDaily.__table__)
+
+
+def hour_start(poll_time):
+    '''Inicio de la hora de un datetime, como clave "YYYY-MM-DD HH:00:00"'''
+    return poll_time.strftime('%Y-%m-%d %H:00:00')
+
+
+def day_start(poll_time):
+    '''Inicio del día de un datetime, como clave "YYYY-MM-DD 00:00:00"'''
+    return poll_time.strftime('%Y-%m-%d 00:00:00')
+
+
+def write_rollups(session, results):
+    """Suma un lote de resultados a los agregados por hora y por día, sin hacer commit
+
+    Args:
+        session (Session): Sesión de SQLAlchemy, normalmente la misma transacción que guarda el lote
+        results (list): PollResult ya filtrados a hosts existentes
+    """
+    hourly = {}
+    daily = {}
+    for result in results:
+        _accumulate(hourly, result, hour_start(result.poll_time))
+        _accumulate(daily, result, day_start(result.poll_time))
+
+    if hourly:
+        session.execute(_UPSERT_HOURLY, list(hourly.values()))
+        session.execute(_UPSERT_DAILY, list(daily.values()))
+
+
+def _accumulate(buckets, result, period_start):
+    key = (result.target.id, period_start)
+    bucket = buckets.get(key)
+    if bucket is None:
+        bucket = buckets[key] = {
+            'host_id': result.target.id,
+            'period_start': period_start,
+            'poll_count': 0,
+            'up_count': 0,
+            'seconds': 0,
+            'up_seconds': 0,
+            'transitions': 0,
+            'rtt_count': 0,
+            'rtt_sum_us': 0,
+            'rtt_min_us': None,
+            'rtt_max_us': None
+        }
+
+    bucket['poll_count'] += 1
+    if result.status == 'Up':
+        bucket['up_count'] += 1
+    if result.elapsed:
+        # The poll accounts for the time since the previous one, in the period it falls in
+        bucket['seconds'] += result.elapsed
+        if result.status == 'Up':
+            bucket['up_seconds'] += result.elapsed
+    if result.previous_status and result.previous_status != result.status:
+        bucket['transitions'] += 1
+
+    probe = result.probe
+    if probe is not None and probe.rtt is not None:
+        bucket['rtt_count'] += 1
+        bucket['rtt_sum_us'] += int(round(probe.rtt * 1000))
+        rtt_min = int(round(probe.rtt_min * 1000))
+        rtt_max = int(round(probe.rtt_max * 1000))
+        if bucket['rtt_min_us'] is None or rtt_min < bucket['rtt_min_us']:
+            bucket['rtt_min_us'] = rtt_min
+        if bucket['rtt_max_us'] is None or rtt_max > bucket['rtt_max_us']:
+            bucket['rtt_max_us'] = rtt_max
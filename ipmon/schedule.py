@@ -0,0 +1,76 @@
+'''Planificación adaptativa del sondeo por host'''
+import heapq
+import threading
+
+
+class PollSchedule():
+    '''Cola de prioridad con la próxima hora de sondeo de cada host'''
+
+    def __init__(self, base_interval=60, min_interval=10, max_backoff=4, stable_polls=5, adaptive=True):
+        self._heap = []
+        self._hosts = {}
+        self._lock = threading.Lock()
+        self.configure(base_interval, min_interval, max_backoff, stable_polls, adaptive)
+
+    def configure(self, base_interval, min_interval=10, max_backoff=4, stable_polls=5, adaptive=True):
+        """Actualiza los límites de planificación
+
+        Args:
+            base_interval (int): Intervalo de sondeo configurado, en segundos
+            min_interval (int, optional): Intervalo para hosts caídos o que acaban de cambiar. Defaults to 10.
+            max_backoff (int, optional): Múltiplo máximo del intervalo base para hosts estables. Defaults to 4.
+            stable_polls (int, optional): Sondeos sin cambios necesarios para duplicar el intervalo. Defaults to 5.
+            adaptive (bool, optional): Si es False todos los hosts usan el intervalo base. Defaults to True.
+        """
+        self.base_interval = base_interval
+        self.min_interval = min(min_interval, base_interval)
+        self.max_backoff = max(1, max_backoff)
+        self.stable_polls = max(1, stable_polls)
+        self.adaptive = adaptive
+
+    def sync(self, host_ids, now):
+        '''Agrega los hosts nuevos, vencidos de inmediato, y olvida los eliminados'''
+        current = set(host_ids)
+        with self._lock:
+            for host_id in [host_id for host_id in self._hosts if host_id not in current]:
+                del self._hosts[host_id]
+            for host_id in current:
+                if host_id not in self._hosts:
+                    self._hosts[host_id] = [now, 0]
+                    heapq.heappush(self._heap, (now, host_id))
+
+    def pop_due(self, now):
+        '''Devuelve los IDs de los hosts cuyo sondeo está vencido'''
+        due = []
+        with self._lock:
+            while self._heap and self._heap[0][0] <= now:
+                when, host_id = heapq.heappop(self._heap)
+                state = self._hosts.get(host_id)
+                if state is None or state[0] != when:
+                    # Host deleted or entry superseded by a later reschedule
+                    continue
+                due.append(host_id)
+                # Placeholder until record() reports the result
+                self._push(host_id, state, now + self.base_interval)
+        return due
+
+    def record(self, host_id, status, changed, now):
+        '''Reprograma un host según el resultado de su último sondeo'''
+        with self._lock:
+            state = self._hosts.get(host_id)
+            if state is None:
+                return
+            state[1] = 0 if changed or status != 'Up' else state[1] + 1
+            self._push(host_id, state, now + self.next_interval(status, changed, state[1]))
+
+    def next_interval(self, status, changed, stable):
+        '''Intervalo hasta el próximo sondeo de un host'''
+        if not self.adaptive:
+            return self.base_interval
+        if changed or status != 'Up':
+            return self.min_interval
+        return self.base_interval * min(self.max_backoff, 2 ** (stable // self.stable_polls))
+
+    def _push(self, host_id, state, when):
+        state[0] = when
+        heapq.heappush(self._heap, (when, host_id))
@@ -13,13 +13,29 @@ class HostsSchema(Schema):
     class Meta:
         '''Meta'''
         fields = ('id', 'ip_address', 'hostname', 'ciudad' , 'cto', 'dispositivo', 'tipo', 'status', 'last_poll', 'status_change_alert', 'previous_status', 'alerts_enabled')
+        datetimeformat = '%Y-%m-%d %H:%M:%S'
 
 
 class PollHistorySchema(Schema):
     '''Esquema del historial de sondeos'''
     class Meta:
         '''Meta'''
-        fields = ('id', 'host_id', 'poll_time', 'poll_status', 'date_created')
+        fields = ('id', 'host_id', 'poll_time', 'poll_status', 'rtt_min_us', 'rtt_avg_us', 'rtt_max_us', 'jitter_us', 'loss_pct', 'date_created')
+        datetimeformat = '%Y-%m-%d %H:%M:%S'
+
+
+class HostRollupsSchema(Schema):
+    '''Esquema de agregados por hora/día'''
+    class Meta:
+        '''Meta'''
+        fields = ('host_id', 'period_start', 'poll_count', 'up_count', 'seconds', 'up_seconds', 'transitions', 'rtt_count', 'rtt_sum_us', 'rtt_min_us', 'rtt_max_us')
+
+
+class RetentionRunsSchema(Schema):
+    '''Esquema de ejecuciones de limpieza del historial'''
+    class Meta:
+        '''Meta'''
+        fields = ('run_time', 'cutoff', 'rows_deleted', 'chunks', 'seconds')
 
 
 class HostAlertsSchema(Schema):
@@ -27,13 +43,14 @@ class HostAlertsSchema(Schema):
     class Meta:
         '''Meta'''
         fields = ('id', 'hostname', 'ip_address', 'host_status', 'poll_time', 'alert_cleared', 'date_created', 'host_id')
+        datetimeformat = '%Y-%m-%d %H:%M:%S'
 
 
 class PollingConfigSchema(Schema):
     '''Esquema de sondeo'''
     class Meta:
         '''Meta'''
-        fields = ('id', 'poll_interval', 'history_truncate_days')
+        fields = ('id', 'poll_interval', 'history_truncate_days', 'max_probes_per_second')
 
 
 class SmtpConfigSchema(Schema):
@@ -92,6 +109,32 @@ class Schemas():
         return PollHistorySchema(many=many)
 
 
+    @staticmethod
+    def host_rollups(many=True):
+        """hourly/daily rollups
+
+        Args:
+            many (bool, optional): Return multiple results. Defaults to True.
+
+        Returns:
+            HostRollupsSchema: Schema object
+        """
+        return HostRollupsSchema(many=many)
+
+
+    @staticmethod
+    def retention_runs(many=True):
+        """poll history cleanup runs
+
+        Args:
+            many (bool, optional): Return multiple results. Defaults to True.
+
+        Returns:
+            RetentionRunsSchema: Schema object
+        """
+        return RetentionRunsSchema(many=many)
+
+
     @staticmethod
     def host_alerts(many=True):
         """host alerts
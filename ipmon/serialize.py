@@ -0,0 +1,61 @@
+'''Serialización JSON de las respuestas de la API directamente desde filas SQL o el estado en memoria
+
+Usa orjson si está instalado y si no el módulo json de la biblioteca estándar. Las fechas se
+escriben con el mismo formato que los esquemas de marshmallow.
+'''
+import os
+import sys
+import json
+
+from datetime import datetime, date
+from flask import Response
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+sys.path.append(os.path.dirname(os.path.realpath(__file__)) + '/../')
+from ipmon.schemas import HostsSchema
+
+MIMETYPE = 'application/json'
+_DATETIME_FORMAT = HostsSchema.Meta.datetimeformat
+
+
+def _default(value):
+    if isinstance(value, datetime):
+        return value.strftime(_DATETIME_FORMAT)
+    if isinstance(value, date):
+        return value.isoformat()
+    raise TypeError('Object of type {} is not JSON serializable'.format(type(value).__name__))
+
+
+def dumps(data):
+    '''Serializa `data` a bytes JSON'''
+    if orjson is not None:
+        return orjson.dumps(data, default=_default, option=orjson.OPT_PASSTHROUGH_DATETIME)
+    return json.dumps(data, default=_default, separators=(',', ':')).encode()
+
+
+def json_response(data, status=200, headers=None):
+    '''Respuesta application/json con `data` serializado'''
+    return Response(dumps(data), status=status, headers=headers, mimetype=MIMETYPE)
+
+
+def columns(model, fields):
+    '''Columnas de la tabla de `model` presentes en `fields` (los campos de un esquema), en ese orden'''
+    table = model.__table__
+    return [table.c[field] for field in fields if field in table.c]
+
+
+def rows(result):
+    '''Filas de una consulta como diccionarios, sin pasar por objetos del ORM'''
+    keys = tuple(result.keys())
+    return [dict(zip(keys, row)) for row in result]
+
+
+def first_row(result):
+    '''Primera fila de una consulta como diccionario, o uno vacío como el dump de marshmallow de None'''
+    keys = tuple(result.keys())
+    row = result.first()
+    return {} if row is None else dict(zip(keys, row))
@@ -0,0 +1,163 @@
+'''Servicios internos: configuración y estado como objetos de Python
+
+Los trabajos del scheduler, los blueprints y las variables globales de las plantillas leen los datos
+de aquí; las rutas de api.py solo serializan lo que devuelven estas funciones. Todas necesitan un
+contexto de aplicación.
+
+La configuración (sondeo, SMTP, temas y alertas de los usuarios) se guarda en una caché del proceso.
+Las rutas que la modifican llaman a invalidate_settings(), que además incrementa settingsVersion
+para que los demás procesos descarten su copia en la siguiente comprobación.
+'''
+import os
+import sys
+import time
+import threading
+
+from collections import namedtuple
+from sqlalchemy import select, update
+
+sys.path.append(os.path.dirname(os.path.realpath(__file__)) + '/../')
+from ipmon import db, config
+from ipmon.database import Polling, SmtpServer, WebThemes, Users, SettingsVersion, SETTINGS_VERSION_ID
+from ipmon.schemas import PollingConfigSchema, SmtpConfigSchema, WebThemesSchema
+from ipmon.serialize import columns
+from ipmon.status import live_status
+from ipmon.targets import probe_targets
+
+# Same fields as the API schemas, so routes can return `._asdict()`
+PollingConfig = namedtuple('PollingConfig', PollingConfigSchema.Meta.fields)
+SmtpConfig = namedtuple('SmtpConfig', SmtpConfigSchema.Meta.fields)
+WebTheme = namedtuple('WebTheme', WebThemesSchema.Meta.fields)
+
+
+class SettingsCache():
+    '''Valores de configuración del proceso, validados contra settingsVersion como mucho cada `check_interval` segundos'''
+
+    def __init__(self, check_interval):
+        self.check_interval = check_interval
+        self._values = {}
+        self._version = None
+        self._checked = None
+        # Bumped on every reset, so a value loaded before the reset is not stored after it
+        self._generation = 0
+        self._lock = threading.Lock()
+
+    def get(self, key, loader):
+        """Valor en caché de `key`, o el que devuelve `loader()` si no está
+
+        Args:
+            key (str): Nombre del valor
+            loader (function): Lee el valor de la base de datos
+
+        Returns:
+            object: Valor de configuración; no se debe modificar
+        """
+        self._validate()
+        try:
+            return self._values[key]
+        except KeyError:
+            generation = self._generation
+            value = loader()
+            with self._lock:
+                if generation == self._generation:
+                    self._values[key] = value
+            return value
+
+    def clear(self):
+        '''Descarta todos los valores'''
+        with self._lock:
+            self._values = {}
+            self._generation += 1
+            self._checked = None
+
+    def _validate(self):
+        now = time.monotonic()
+        if self._checked is not None and now - self._checked < self.check_interval:
+            return
+        with self._lock:
+            version = db.session.execute(select(SettingsVersion.version).where(SettingsVersion.id == SETTINGS_VERSION_ID)).scalar()
+            if version != self._version:
+                self._values = {}
+                self._generation += 1
+                self._version = version
+            self._checked = now
+
+
+settings_cache = SettingsCache(config['Settings_Cache']['Check_Interval'])
+
+
+def invalidate_settings():
+    '''Descarta la configuración en caché en todos los procesos; llamar después de guardar cambios'''
+    bumped = db.session.execute(
+        update(SettingsVersion).where(SettingsVersion.id == SETTINGS_VERSION_ID).values(version=SettingsVersion.version + 1)
+    ).rowcount
+    if not bumped:
+        db.session.add(SettingsVersion(id=SETTINGS_VERSION_ID, version=1))
+    db.session.commit()
+    settings_cache.clear()
+
+
+def _first(model_type, model, fields, *criteria):
+    row = db.session.execute(select(*columns(model, fields)).where(*criteria).limit(1)).first()
+    return None if row is None else model_type(*row)
+
+
+def get_polling_config():
+    '''Configuración de sondeo (PollingConfig), o None si aún no existe'''
+    return settings_cache.get('polling', lambda: _first(
+        PollingConfig, Polling, PollingConfigSchema.Meta.fields, Polling.id == 1
+    ))
+
+
+def get_smtp_config():
+    '''Servidor SMTP (SmtpConfig), o None si no hay ninguno'''
+    return settings_cache.get('smtp', lambda: _first(SmtpConfig, SmtpServer, SmtpConfigSchema.Meta.fields))
+
+
+def smtp_configured(smtp=None):
+    """Indica si hay servidor, puerto y remitente SMTP
+
+    Args:
+        smtp (SmtpConfig, optional): Configuración ya leída. Por defecto se lee de la base de datos.
+
+    Returns:
+        bool: True si se pueden enviar correos
+    """
+    smtp = smtp or get_smtp_config()
+    return bool(smtp and smtp.smtp_server and smtp.smtp_port and smtp.smtp_sender)
+
+
+def get_alerts_enabled():
+    '''Indica si el usuario tiene las alertas activadas'''
+    # TODO Should check this by user id
+    return settings_cache.get('alerts_enabled', lambda: bool(
+        db.session.execute(select(Users.alerts_enabled).limit(1)).scalar()
+    ))
+
+
+def get_alert_recipients():
+    '''Correos de los usuarios con las alertas activadas'''
+    return settings_cache.get('alert_recipients', lambda: tuple(
+        db.session.execute(select(Users.email).where(Users.alerts_enabled.is_(True))).scalars()
+    ))
+
+
+def get_web_themes():
+    '''Temas (WebTheme) ordenados por ID'''
+    return settings_cache.get('web_themes', lambda: tuple(
+        WebTheme(*row)
+        for row in db.session.execute(select(*columns(WebThemes, WebThemesSchema.Meta.fields)).order_by(WebThemes.id))
+    ))
+
+
+def get_active_theme():
+    '''Tema activo (WebTheme), o None'''
+    return settings_cache.get('active_theme', lambda: _first(
+        WebTheme, WebThemes, WebThemesSchema.Meta.fields, WebThemes.active.is_(True)
+    ))
+
+
+def get_hosts():
+    '''Hosts de la tabla de estado en vivo con el formato de Schemas.hosts'''
+    probe_targets.get()
+    return live_status.hosts()[0]
@@ -8,9 +8,11 @@ from passlib.hash import sha256_crypt
 
 sys.path.append(os.path.dirname(os.path.realpath(__file__)) + '/../')
 from ipmon import db, config, app
-from ipmon.database import Users, Polling, SmtpServer, WebThemes
+from ipmon.database import Users, Polling, SmtpServer, WebThemes, SettingsVersion, SETTINGS_VERSION_ID, \
+    HOSTS_VERSION_ID
 from ipmon.forms import FirstTimeSetupForm
-from ipmon.main import init_schedulers, database_configured
+from ipmon.main import database_configured
+from ipmon.poller import start as start_poller
 from ipmon.auth import test_password
 
 bp = Blueprint('setup', __name__)
@@ -74,11 +76,15 @@ def setup():
             web_theme = WebThemes(theme_name=theme, theme_path=config['Web_Themes'][theme], active=active)
             db.session.add(web_theme)
 
+        # Settings and hosts version stamps, bumped on every write
+        db.session.add(SettingsVersion(id=SETTINGS_VERSION_ID, version=0))
+        db.session.add(SettingsVersion(id=HOSTS_VERSION_ID, version=0))
 
         # Commit DB updates
         db.session.commit()
 
-        # Initialize schedulers
-        init_schedulers()
+        # Start polling here only when it is embedded; otherwise ipmon-poller can start now
+        if config['Poller']['Embedded']:
+            start_poller()
 
         return redirect(url_for('main.index'))
@@ -2,7 +2,6 @@
 import os
 import sys
 import smtplib
-import json
 
 import flask_login
 from email.mime.text import MIMEText
@@ -11,7 +10,7 @@ from flask import Blueprint, render_template, redirect, url_for, request, flash
 sys.path.append(os.path.dirname(os.path.realpath(__file__)) + '/../')
 from ipmon import db, log
 from ipmon.database import SmtpServer
-from ipmon.api import get_smtp_configured, get_smtp_config
+from ipmon.services import get_smtp_config, smtp_configured, invalidate_settings
 from ipmon.forms import SmtpConfigForm
 
 smtp = Blueprint('smtp', __name__)
@@ -26,7 +25,7 @@ def configure_smtp():
     '''Configuración SMTP'''
     form = SmtpConfigForm()
     if request.method == 'GET':
-        return render_template('smtpConfig.html', smtp=json.loads(get_smtp_config()), form=form)
+        return render_template('smtpConfig.html', smtp=get_smtp_config(), form=form)
     elif request.method == 'POST':
         if request.form.get('action') == 'delete':
             try:
@@ -37,6 +36,7 @@ def configure_smtp():
                 smtp_conf.smtp_user = ''
                 smtp_conf.smtp_password = ''
                 db.session.commit()
+                invalidate_settings()
                 flash('Configuración SMTP eliminada correctamente', 'success')
             except Exception:
                 flash('Error al eliminar Configuración SMTP', 'danger')
@@ -52,6 +52,7 @@ def configure_smtp():
                     smtp_conf.smtp_user = form.user.data
                     smtp_conf.smtp_password = form.password.data
                     db.session.commit()
+                    invalidate_settings()
                     flash('Configuración de SMTP actualizada correctamente', 'success')
                 except Exception as exc:
                     flash('Error al actualizar SMTP : {}'.format(exc), 'danger')
@@ -84,29 +85,29 @@ def smtp_test():
 ##########################
 def send_smtp_message(recipient, subject, message):
     '''Send SMTP message'''
-    current_smtp = json.loads(get_smtp_config())
-    if not json.loads(get_smtp_configured())['smtp_configured']:
+    current_smtp = get_smtp_config()
+    if not smtp_configured(current_smtp):
         log.error('Attempting to send SMTP message but SMTP not configured.')
         return
 
     msg = MIMEText(message, 'html')
     msg['Subject'] = subject
-    msg['From'] = current_smtp['smtp_sender']
+    msg['From'] = current_smtp.smtp_sender
 
     try:
-        server = smtplib.SMTP(current_smtp['smtp_server'], int(current_smtp['smtp_port']), timeout=10)
+        server = smtplib.SMTP(current_smtp.smtp_server, int(current_smtp.smtp_port), timeout=10)
         server.set_debuglevel(1)   # Muestra detalles para debug en consola
         server.ehlo()
         server.starttls()
         server.ehlo()
 
         # Login SMTP con usuario y contraseña
-        smtp_user = current_smtp.get('smtp_user')
-        smtp_password = current_smtp.get('smtp_password')
+        smtp_user = current_smtp.smtp_user
+        smtp_password = current_smtp.smtp_password
         if smtp_user and smtp_password:
             server.login(smtp_user, smtp_password)
 
-        server.sendmail(current_smtp['smtp_sender'], recipient, msg.as_string())
+        server.sendmail(current_smtp.smtp_sender, recipient, msg.as_string())
         server.quit()
     except Exception as exc:
         log.error(f'Error enviando correo SMTP: {exc}')
@@ -0,0 +1,368 @@
+'''Tabla en memoria del estado en vivo de cada host, servida directamente por la API del dashboard'''
+import os
+import sys
+import time
+import threading
+
+from collections import OrderedDict
+
+sys.path.append(os.path.dirname(os.path.realpath(__file__)) + '/../')
+from ipmon.history import TIME_FORMAT
+from ipmon.serialize import dumps
+
+# Same keys and order as Schemas.hosts
+HOST_FIELDS = (
+    'id', 'ip_address', 'hostname', 'ciudad', 'cto', 'dispositivo', 'tipo',
+    'status', 'last_poll', 'previous_status', 'alerts_enabled'
+)
+# Columns edited by users; changes to them count as state changes on reload
+_EDITABLE_FIELDS = ('ip_address', 'hostname', 'ciudad', 'cto', 'dispositivo', 'tipo', 'alerts_enabled')
+# Exact-match filters of the DataTables server-side view
+FILTER_FIELDS = ('status', 'ciudad', 'cto', 'dispositivo', 'tipo')
+# Columns of the grouped Up/Down breakdown
+GROUP_FIELDS = ('ciudad', 'cto', 'dispositivo', 'tipo')
+# Columns matched by the DataTables global search, besides status
+_SEARCH_FIELDS = ('hostname', 'ip_address', 'ciudad', 'cto', 'dispositivo', 'tipo')
+_NO_HOSTS = frozenset()
+
+
+def _sort_key(value):
+    '''Orden de DataTables: texto sin distinguir mayúsculas y valores nulos al final'''
+    return (value is None, value.lower() if isinstance(value, str) else value)
+
+
+class HostSlot():
+    '''Estado de un host; `version` es la versión de la tabla en que cambió por última vez'''
+    __slots__ = HOST_FIELDS + ('version', 'search_text')
+
+    def __init__(self, row, version):
+        for field in HOST_FIELDS:
+            setattr(self, field, getattr(row, field))
+        self.version = version
+        self.search_text = '\n'.join(str(getattr(row, field) or '') for field in _SEARCH_FIELDS).lower()
+
+    def to_dict(self):
+        '''Diccionario con el formato de Schemas.hosts'''
+        data = {field: getattr(self, field) for field in HOST_FIELDS}
+        if self.last_poll is not None and not isinstance(self.last_poll, str):
+            data['last_poll'] = self.last_poll.strftime(TIME_FORMAT)
+        return data
+
+
+class StatusTable():
+    """Un slot por host con el último estado visto por el poller y un número de versión
+
+    El poller es la fuente de verdad del estado: `transition` actualiza el slot en cuanto termina
+    la sonda, antes de que el escritor lo guarde. `load` solo trae de la base de datos los datos
+    editables del host y conserva el estado de los hosts ya conocidos.
+    Los workers web no sondean: recargan la tabla de la base de datos cada pocos segundos y
+    adoptan el estado que el proceso de sondeo ya guardó.
+
+    `version` cambia con cada sonda. Los cambios de estado (Up/Down, edición, alta o baja de un
+    host) se anotan además en un registro ordenado por versión para que `changes` devuelva solo
+    esos hosts. La versión sigue el reloj en microsegundos, así crece entre reinicios del proceso
+    y es comparable entre los workers web.
+    """
+
+    def __init__(self):
+        self._slots = {}
+        self._counts = {}
+        # host_id -> version of its last state change, oldest first
+        self._state_log = OrderedDict()
+        self._listeners = []
+        # field -> value -> host IDs, for FILTER_FIELDS
+        self._buckets = {field: {} for field in FILTER_FIELDS}
+        # field -> value -> status -> hosts, for GROUP_FIELDS; updated on each transition
+        self._groups = {field: {} for field in GROUP_FIELDS}
+        # field -> (stamp, host IDs sorted by field, host ID -> position)
+        self._orders = {}
+        self._load_version = None
+        self._status_version = None
+        self._lock = threading.Lock()
+        self._cache = None
+        self._cache_version = None
+        self.version = int(time.time() * 1000000)
+        self._floor = self.version
+        self.loaded = False
+
+    def load(self, rows):
+        """Reemplaza el conjunto de hosts con filas de la tabla hosts
+
+        Args:
+            rows (list): Filas con las columnas de HOST_FIELDS
+        """
+        with self._lock:
+            previous_version = self.version
+            # Follow the clock, so reloads in different processes give comparable versions
+            self.version = max(self.version + 1, int(time.time() * 1000000))
+            edited = not self.loaded
+            changed = edited
+            polled = False
+            slots = {}
+            for row in rows:
+                slot = HostSlot(row, self.version)
+                known = self._slots.get(row.id)
+                if known is not None and known.last_poll is not None and \
+                        (slot.last_poll is None or known.last_poll >= slot.last_poll):
+                    # The database lags behind the write buffer; keep what the poller saw
+                    slot.status = known.status
+                    slot.previous_status = known.previous_status
+                    slot.last_poll = known.last_poll
+                if known is None or any(getattr(known, field) != getattr(slot, field) for field in _EDITABLE_FIELDS):
+                    edited = True
+                    self._log_state(row.id)
+                elif known.status != slot.status:
+                    changed = True
+                    self._log_state(row.id)
+                elif known.last_poll != slot.last_poll or known.previous_status != slot.previous_status:
+                    polled = True
+                else:
+                    slot.version = known.version
+                slots[row.id] = slot
+            for host_id in self._slots:
+                if host_id not in slots:
+                    edited = True
+                    self._log_state(host_id)
+            if not (edited or changed or polled):
+                # Nothing new in the database: keep the version, so ETags and caches stay valid
+                self.version = previous_version
+                return
+            self._slots = slots
+            self._counts = {}
+            self._buckets = {field: {} for field in FILTER_FIELDS}
+            self._groups = {field: {} for field in GROUP_FIELDS}
+            for slot in slots.values():
+                self._counts[slot.status] = self._counts.get(slot.status, 0) + 1
+                for field in FILTER_FIELDS:
+                    self._buckets[field].setdefault(getattr(slot, field), set()).add(slot.id)
+                for field in GROUP_FIELDS:
+                    counts = self._groups[field].setdefault(getattr(slot, field), {})
+                    counts[slot.status] = counts.get(slot.status, 0) + 1
+            # Reloads that only bring new poll times keep the sort orders and the counts ETags
+            if edited:
+                self._load_version = self.version
+            if edited or changed:
+                self._status_version = self.version
+            self.loaded = True
+            version = self.version
+            counts = self._counts_dict()
+        self._notify('hosts', {'version': version}, counts)
+
+    def transition(self, host_id, status, poll_time):
+        """Registra el resultado de una sonda
+
+        Returns:
+            tuple: Estado anterior del host y la hora de su sondeo anterior, o (None, None) si no
+                está en la tabla
+        """
+        with self._lock:
+            slot = self._slots.get(host_id)
+            if slot is None:
+                return None, None
+            previous = slot.status
+            previous_poll = slot.last_poll
+            self.version += 1
+            slot.previous_status = previous
+            slot.status = status
+            slot.last_poll = poll_time
+            slot.version = self.version
+            if previous == status:
+                return previous, previous_poll
+            self._counts[previous] = self._counts.get(previous, 0) - 1
+            self._counts[status] = self._counts.get(status, 0) + 1
+            self._buckets['status'].get(previous, set()).discard(host_id)
+            self._buckets['status'].setdefault(status, set()).add(host_id)
+            for field in GROUP_FIELDS:
+                counts = self._groups[field][getattr(slot, field)]
+                counts[previous] = counts.get(previous, 0) - 1
+                counts[status] = counts.get(status, 0) + 1
+            self._status_version = self.version
+            self._log_state(host_id)
+            host = slot.to_dict()
+            host['version'] = self.version
+            counts = self._counts_dict()
+        self._notify('transition', host, counts)
+        return previous, previous_poll
+
+    def subscribe(self, listener):
+        '''Registra `listener(event, data, counts)` para cada cambio de estado ('transition' o 'hosts')'''
+        self._listeners.append(listener)
+
+    def changes(self, since):
+        """Hosts cuyo estado cambió después de la versión `since`
+
+        Recorre el registro desde el final, así el costo depende de los cambios y no del número de
+        hosts.
+
+        Args:
+            since (int): Versión que ya tiene el cliente
+
+        Returns:
+            dict: `version` actual, `changed` (hosts con el formato de Schemas.hosts), `removed`
+                (IDs eliminados), `counts` y `reset`, que indica al cliente que recargue todo porque
+                `since` es de otro proceso o anterior a la carga de la tabla
+        """
+        with self._lock:
+            changed = []
+            removed = []
+            reset = not self._floor <= since <= self.version
+            if not reset:
+                for host_id, version in reversed(self._state_log.items()):
+                    if version <= since:
+                        break
+                    slot = self._slots.get(host_id)
+                    if slot is None:
+                        removed.append(host_id)
+                    else:
+                        changed.append(slot.to_dict())
+            return {
+                'version': self.version,
+                'changed': changed,
+                'removed': removed,
+                'counts': self._counts_dict(),
+                'reset': reset
+            }
+
+    @property
+    def state_version(self):
+        '''Versión del último cambio de estado o recarga; los conteos solo cambian con ella'''
+        return self._status_version
+
+    def group_counts(self, fields=GROUP_FIELDS):
+        """Hosts Up y Down por cada valor de los campos de GROUP_FIELDS
+
+        Args:
+            fields (tuple, optional): Campos a incluir. Por defecto todos.
+
+        Returns:
+            tuple: Diccionario campo -> lista de `value`, `total_hosts`, `available_hosts` y
+                `unavailable_hosts` ordenada por valor, y state_version
+        """
+        with self._lock:
+            groups = {}
+            for field in fields:
+                groups[field] = [
+                    {
+                        'value': value,
+                        'total_hosts': sum(counts.values()),
+                        'available_hosts': counts.get('Up', 0),
+                        'unavailable_hosts': counts.get('Down', 0)
+                    }
+                    for value, counts in sorted(self._groups[field].items(), key=lambda item: _sort_key(item[0]))
+                ]
+            return groups, self._status_version
+
+    def page(self, start=0, length=10, search='', order=None, descending=False, filters=None):
+        """Una página de hosts filtrada y ordenada, para el modo server-side de DataTables
+
+        Los filtros exactos se resuelven con los conjuntos de IDs por valor y el orden con
+        posiciones precalculadas por columna (se recalculan solo cuando la columna cambia), así
+        sin búsqueda el costo depende del tamaño de la página y de los hosts que pasan los
+        filtros, no del total de hosts. La búsqueda de texto recorre los candidatos.
+
+        Args:
+            start (int): Primera fila de la página
+            length (int): Filas por página, o None para todas
+            search (str): Texto a buscar en hostname, IP, ciudad, cto, dispositivo, tipo y estado
+            order (str, optional): Campo de HOST_FIELDS por el que ordenar. Por defecto el ID.
+            descending (bool): Orden descendente
+            filters (dict, optional): Campo de FILTER_FIELDS -> valor exacto
+
+        Returns:
+            dict: `data` (hosts con el formato de Schemas.hosts), `total`, `filtered` y `version`
+        """
+        with self._lock:
+            ids = None
+            if filters:
+                matches = sorted(
+                    (self._buckets[field].get(value, _NO_HOSTS) for field, value in filters.items()), key=len
+                )
+                ids = matches[0].intersection(*matches[1:])
+            search = search.lower()
+            if search:
+                ids = [
+                    host_id for host_id in (self._slots if ids is None else ids)
+                    if search in self._slots[host_id].search_text or search in str(self._slots[host_id].status).lower()
+                ]
+
+            stop = None if length is None else start + length
+            if ids is None:
+                # No filters: slice the cached ordering directly
+                ordered = self._order(order or 'id')[1]
+                total = len(ordered)
+                if descending:
+                    page = ordered[max(total - stop, 0) if stop is not None else 0:max(total - start, 0)][::-1]
+                else:
+                    page = ordered[start:stop]
+                filtered = total
+            else:
+                filtered = len(ids)
+                if order is None or order == 'id':
+                    page = sorted(ids, reverse=descending)[start:stop]
+                else:
+                    positions = self._order(order)[2]
+                    page = sorted(ids, key=positions.__getitem__, reverse=descending)[start:stop]
+
+            return {
+                'data': [self._slots[host_id].to_dict() for host_id in page],
+                'total': len(self._slots),
+                'filtered': filtered,
+                'version': self.version
+            }
+
+    def _order(self, field):
+        '''IDs ordenados por `field` y la posición de cada uno; en caché hasta que el campo cambie'''
+        if field in _EDITABLE_FIELDS or field == 'id':
+            stamp = self._load_version
+        elif field == 'status':
+            stamp = self._status_version
+        else:
+            # last_poll and previous_status change with every probe
+            stamp = self.version
+        cached = self._orders.get(field)
+        if cached is None or cached[0] != stamp:
+            # Slots are kept in ID order, so ties stay ordered by ID
+            ordered = sorted(self._slots, key=lambda host_id: _sort_key(getattr(self._slots[host_id], field)))
+            cached = (stamp, ordered, {host_id: position for position, host_id in enumerate(ordered)})
+            self._orders[field] = cached
+        return cached
+
+    def _counts_dict(self):
+        return {
+            'total_hosts': len(self._slots),
+            'available_hosts': self._counts.get('Up', 0),
+            'unavailable_hosts': self._counts.get('Down', 0)
+        }
+
+    def _notify(self, event, data, counts):
+        for listener in self._listeners:
+            listener(event, data, counts)
+
+    def _log_state(self, host_id):
+        self._state_log.pop(host_id, None)
+        self._state_log[host_id] = self.version
+
+    def hosts(self):
+        '''Lista de hosts con el formato de Schemas.hosts y la versión que representa'''
+        with self._lock:
+            return [slot.to_dict() for slot in self._slots.values()], self.version
+
+    def hosts_json(self):
+        '''Igual que hosts() ya serializado a bytes JSON; se reutiliza mientras la versión no cambie'''
+        with self._lock:
+            if self._cache_version == self.version:
+                return self._cache, self.version
+        hosts, version = self.hosts()
+        data = dumps(hosts)
+        with self._lock:
+            self._cache = data
+            self._cache_version = version
+        return data, version
+
+    def counts(self):
+        '''Total de hosts y cuántos hay en cada estado, con state_version'''
+        with self._lock:
+            return len(self._slots), dict(self._counts), self._status_version
+
+
+live_status = StatusTable()
@@ -0,0 +1,94 @@
+'''Instantánea en memoria de los hosts a sondear'''
+import os
+import sys
+import time
+import threading
+
+from collections import namedtuple
+from sqlalchemy import select, update
+
+sys.path.append(os.path.dirname(os.path.realpath(__file__)) + '/../')
+from ipmon import db, config
+from ipmon.database import Hosts, SettingsVersion, HOSTS_VERSION_ID
+from ipmon.status import live_status, HOST_FIELDS
+
+ProbeTarget = namedtuple('ProbeTarget', ['id', 'ip_address', 'hostname', 'alerts_enabled'])
+# `elapsed`: seconds since the host's previous poll, the time this result accounts for in availability
+PollResult = namedtuple(
+    'PollResult', ['target', 'previous_status', 'status', 'poll_time', 'probe', 'elapsed'], defaults=(None, None)
+)
+
+_hosts = Hosts.__table__
+
+
+class TargetCache():
+    """Tupla inmutable de ProbeTarget cargada una vez y recargada cuando se editan los hosts; también carga live_status
+
+    Las ediciones incrementan la fila HOSTS_VERSION_ID de settingsVersion, así el proceso de sondeo
+    y los demás workers web recargan sin esperar a que venza `ttl`.
+    """
+
+    def __init__(self, ttl, check_interval):
+        self.ttl = ttl
+        self.check_interval = check_interval
+        self._targets = None
+        self._loaded = 0
+        self._checked = 0
+        self._version = None
+        self._generation = 0
+        self._lock = threading.Lock()
+
+    def invalidate(self):
+        '''Fuerza la recarga en todos los procesos; llamar después de agregar, editar o eliminar hosts'''
+        bumped = db.session.execute(
+            update(SettingsVersion).where(SettingsVersion.id == HOSTS_VERSION_ID).values(version=SettingsVersion.version + 1)
+        ).rowcount
+        if not bumped:
+            db.session.add(SettingsVersion(id=HOSTS_VERSION_ID, version=1))
+        db.session.commit()
+        with self._lock:
+            self._generation += 1
+            self._targets = None
+
+    def get(self):
+        '''Devuelve los hosts a sondear; requiere app context si hay que recargarlos'''
+        now = time.monotonic()
+        with self._lock:
+            targets = self._targets
+            generation = self._generation
+            if targets is not None and now - self._loaded < self.ttl and now - self._checked < self.check_interval:
+                return targets
+
+        version = self._read_version()
+        if targets is not None and now - self._loaded < self.ttl and version == self._version:
+            self._checked = now
+            return targets
+
+        rows = db.session.execute(
+            select(*[_hosts.c[field] for field in HOST_FIELDS]).order_by(_hosts.c.id)
+        ).all()
+        targets = tuple(ProbeTarget(row.id, row.ip_address, row.hostname, row.alerts_enabled) for row in rows)
+
+        with self._lock:
+            # The live status table keeps the status of hosts the poller has already seen
+            live_status.load(rows)
+            if generation == self._generation:
+                self._targets = targets
+                self._loaded = self._checked = now
+                self._version = version
+        return targets
+
+    @staticmethod
+    def _read_version():
+        return db.session.execute(
+            select(SettingsVersion.version).where(SettingsVersion.id == HOSTS_VERSION_ID)
+        ).scalar()
+
+    def transition(self, host_id, status, poll_time):
+        '''Registra el nuevo estado de un host en la tabla en vivo; devuelve el estado y la hora del sondeo anteriores'''
+        return live_status.transition(host_id, status, poll_time)
+
+
+# Web workers only read the table, so they refresh it from the database often; the poller sets
+# `ttl` to config['Target_Cache_TTL'] since it is the one keeping it up to date
+probe_targets = TargetCache(config['Poller']['Status_Refresh'], config['Settings_Cache']['Check_Interval'])
@@ -0,0 +1,160 @@
+'''Escritura diferida de resultados de sondeo con un único hilo escritor'''
+import os
+import sys
+import time
+import queue
+import threading
+
+from concurrent.futures import Future
+
+sys.path.append(os.path.dirname(os.path.realpath(__file__)) + '/../')
+from ipmon import app, db, config, log
+from ipmon.persistence import write_poll_results, StatusIntervalWriter
+
+_STOP = object()
+
+
+class _Task():
+    def __init__(self, func, args):
+        self.func = func
+        self.args = args
+        self.future = Future()
+
+
+class ResultWriter():
+    '''Buffer acotado de resultados que un único hilo vuelca a la base de datos por tamaño o tiempo'''
+
+    def __init__(self, maxsize=50000, batch_size=500, flush_interval=1.0):
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self._queue = queue.Queue(maxsize)
+        self._thread = None
+        self._lock = threading.Lock()
+        self._intervals = StatusIntervalWriter(config['Interval_Flush_Window'])
+        self._stats = {
+            'enqueued': 0,
+            'written': 0,
+            'failed': 0,
+            'flushes': 0,
+            'rejected_full': 0,
+            'max_queued': 0,
+            'last_flush_rows': 0,
+            'last_flush_seconds': 0.0
+        }
+
+    def start(self):
+        '''Inicia el hilo escritor si aún no está corriendo'''
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name='IPMON DB Writer', daemon=True)
+                self._thread.start()
+
+    def stop(self, timeout=10):
+        '''Vuelca lo pendiente y detiene el hilo escritor'''
+        if self._thread is not None and self._thread.is_alive():
+            self._queue.put(_STOP)
+            self._thread.join(timeout)
+
+    def put(self, result):
+        '''Encola un resultado sin bloquear; devuelve False si el buffer está lleno'''
+        self.start()
+        try:
+            self._queue.put_nowait(result)
+        except queue.Full:
+            self._stats['rejected_full'] += 1
+            return False
+
+        self._stats['enqueued'] += 1
+        depth = self._queue.qsize()
+        if depth > self._stats['max_queued']:
+            self._stats['max_queued'] = depth
+        return True
+
+    def submit(self, func, *args):
+        """Ejecuta `func(*args)` en el hilo escritor, después de volcar los resultados ya encolados
+
+        Returns:
+            Future: Resultado de la función
+        """
+        self.start()
+        task = _Task(func, args)
+        self._queue.put(task)
+        return task.future
+
+    def metrics(self):
+        '''Métricas de ocupación y rendimiento del buffer'''
+        metrics = dict(self._stats)
+        metrics['queued'] = self._queue.qsize()
+        metrics['capacity'] = self._queue.maxsize
+        return metrics
+
+    def _run(self):
+        with app.app_context():
+            batch = []
+            deadline = None
+            while True:
+                timeout = max(0, deadline - time.monotonic()) if batch else None
+                try:
+                    item = self._queue.get(timeout=timeout)
+                except queue.Empty:
+                    item = None
+
+                if item is _STOP or isinstance(item, _Task):
+                    # Keep ordering: everything queued before the task is written first
+                    self._flush(batch)
+                    batch = []
+                    if item is _STOP:
+                        self._close()
+                        return
+                    self._execute(item)
+                    continue
+
+                if item is not None:
+                    if not batch:
+                        deadline = time.monotonic() + self.flush_interval
+                    batch.append(item)
+
+                if batch and (len(batch) >= self.batch_size or time.monotonic() >= deadline):
+                    self._flush(batch)
+                    batch = []
+
+    def _flush(self, batch):
+        if not batch:
+            return
+        s = time.perf_counter()
+        try:
+            if config['History_Mode'] == 'intervals':
+                self._intervals.write(db.session, batch)
+            else:
+                write_poll_results(db.session, batch)
+            self._stats['written'] += len(batch)
+        except Exception as exc:
+            db.session.rollback()
+            self._stats['failed'] += len(batch)
+            log.error('Failed to write {} poll results: {}'.format(len(batch), exc))
+        self._stats['flushes'] += 1
+        self._stats['last_flush_rows'] = len(batch)
+        self._stats['last_flush_seconds'] = time.perf_counter() - s
+
+    def _close(self):
+        if config['History_Mode'] != 'intervals':
+            return
+        try:
+            self._intervals.flush_ends(db.session)
+        except Exception as exc:
+            db.session.rollback()
+            log.error('Failed to write status interval ends: {}'.format(exc))
+
+    def _execute(self, task):
+        try:
+            task.future.set_result(task.func(*task.args))
+        except Exception as exc:
+            db.session.rollback()
+            task.future.set_exception(exc)
+
+
+result_writer = ResultWriter(
+    maxsize=config['Write_Buffer']['Max_Queued'],
+    batch_size=config['Write_Buffer']['Batch_Size'],
+    flush_interval=config['Write_Buffer']['Flush_Interval']
+)
@@ -0,0 +1,24 @@
+"""Add probes per second limit to polling config
+Revision ID: 3f9a1c2d7e41
+Revises: b47144cc888e
+Create Date: 2026-10-18 08:30:00.000000
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '3f9a1c2d7e41'
+down_revision = 'b47144cc888e'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('polling') as batch_op:
+        batch_op.add_column(sa.Column('max_probes_per_second', sa.Integer(), nullable=False, server_default='1000'))
+
+
+def downgrade():
+    with op.batch_alter_table('polling') as batch_op:
+        batch_op.drop_column('max_probes_per_second')
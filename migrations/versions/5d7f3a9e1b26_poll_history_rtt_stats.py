@@ -0,0 +1,32 @@
+"""Add RTT, jitter and packet loss columns to poll history
+Revision ID: 5d7f3a9e1b26
+Revises: 8c2e5b7a9d13
+Create Date: 2026-10-18 08:50:00.000000
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '5d7f3a9e1b26'
+down_revision = '8c2e5b7a9d13'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('pollHistory') as batch_op:
+        batch_op.add_column(sa.Column('rtt_min_us', sa.Integer(), nullable=True))
+        batch_op.add_column(sa.Column('rtt_avg_us', sa.Integer(), nullable=True))
+        batch_op.add_column(sa.Column('rtt_max_us', sa.Integer(), nullable=True))
+        batch_op.add_column(sa.Column('jitter_us', sa.Integer(), nullable=True))
+        batch_op.add_column(sa.Column('loss_pct', sa.SmallInteger(), nullable=True))
+
+
+def downgrade():
+    with op.batch_alter_table('pollHistory') as batch_op:
+        batch_op.drop_column('loss_pct')
+        batch_op.drop_column('jitter_us')
+        batch_op.drop_column('rtt_max_us')
+        batch_op.drop_column('rtt_avg_us')
+        batch_op.drop_column('rtt_min_us')
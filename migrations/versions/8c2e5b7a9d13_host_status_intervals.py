@@ -0,0 +1,33 @@
+"""Add host status intervals table for change-only history
+Revision ID: 8c2e5b7a9d13
+Revises: 3f9a1c2d7e41
+Create Date: 2026-10-18 08:40:00.000000
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '8c2e5b7a9d13'
+down_revision = '3f9a1c2d7e41'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        'hostStatusIntervals',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('status', sa.String(length=10), nullable=True),
+        sa.Column('start_time', sa.String(length=20), nullable=True),
+        sa.Column('end_time', sa.String(length=20), nullable=True),
+        sa.Column('host_id', sa.Integer(), nullable=True),
+        sa.ForeignKeyConstraint(['host_id'], ['hosts.id']),
+        sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_hostStatusIntervals_host_id_start_time', 'hostStatusIntervals', ['host_id', 'start_time'])
+
+
+def downgrade():
+    op.drop_index('ix_hostStatusIntervals_host_id_start_time', table_name='hostStatusIntervals')
+    op.drop_table('hostStatusIntervals')
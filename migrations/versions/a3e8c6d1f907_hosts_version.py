@@ -0,0 +1,27 @@
+"""Add hosts version stamp so the poller process reloads hosts edited from the web
+Revision ID: a3e8c6d1f907
+Revises: f1d6b3a8c572
+Create Date: 2026-10-18 11:20:00.000000
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'a3e8c6d1f907'
+down_revision = 'f1d6b3a8c572'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    settings_version = sa.table(
+        'settingsVersion',
+        sa.column('id', sa.Integer()),
+        sa.column('version', sa.Integer())
+    )
+    op.bulk_insert(settings_version, [{'id': 2, 'version': 0}])
+
+
+def downgrade():
+    op.execute('DELETE FROM "settingsVersion" WHERE id = 2')
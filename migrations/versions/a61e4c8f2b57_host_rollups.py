@@ -0,0 +1,53 @@
+"""Add hourly and daily host rollup tables and backfill them from poll history
+Revision ID: a61e4c8f2b57
+Revises: 5d7f3a9e1b26
+Create Date: 2026-10-18 09:00:00.000000
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'a61e4c8f2b57'
+down_revision = '5d7f3a9e1b26'
+branch_labels = None
+depends_on = None
+
+ROLLUPS = {
+    'hostRollupsHourly': "substr(poll_time, 1, 13) || ':00:00'",
+    'hostRollupsDaily': "substr(poll_time, 1, 10) || ' 00:00:00'"
+}
+
+
+def upgrade():
+    for table, period_start in ROLLUPS.items():
+        op.create_table(
+            table,
+            sa.Column('id', sa.Integer(), nullable=False),
+            sa.Column('period_start', sa.String(length=20), nullable=False),
+            sa.Column('poll_count', sa.Integer(), nullable=False),
+            sa.Column('up_count', sa.Integer(), nullable=False),
+            sa.Column('transitions', sa.Integer(), nullable=False),
+            sa.Column('rtt_count', sa.Integer(), nullable=False),
+            sa.Column('rtt_sum_us', sa.BigInteger(), nullable=False),
+            sa.Column('rtt_min_us', sa.Integer(), nullable=True),
+            sa.Column('rtt_max_us', sa.Integer(), nullable=True),
+            sa.Column('host_id', sa.Integer(), nullable=False),
+            sa.ForeignKeyConstraint(['host_id'], ['hosts.id']),
+            sa.PrimaryKeyConstraint('id'),
+            sa.UniqueConstraint('host_id', 'period_start', name='uq_{}_host_id_period_start'.format(table))
+        )
+        # Transitions are not recoverable from existing history and start at 0
+        op.execute(
+            'INSERT INTO "{table}" (host_id, period_start, poll_count, up_count, transitions, '
+            'rtt_count, rtt_sum_us, rtt_min_us, rtt_max_us) '
+            'SELECT host_id, {period_start}, count(*), sum(poll_status = \'Up\'), 0, '
+            'count(rtt_avg_us), coalesce(sum(rtt_avg_us), 0), min(rtt_min_us), max(rtt_max_us) '
+            'FROM "pollHistory" WHERE host_id IS NOT NULL AND poll_time IS NOT NULL '
+            'GROUP BY host_id, {period_start}'.format(table=table, period_start=period_start)
+        )
+
+
+def downgrade():
+    for table in ROLLUPS:
+        op.drop_table(table)
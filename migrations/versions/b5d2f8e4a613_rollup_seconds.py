@@ -0,0 +1,45 @@
+"""Add polled seconds to the host rollups and backfill them from poll history
+Revision ID: b5d2f8e4a613
+Revises: a3e8c6d1f907
+Create Date: 2026-10-18 13:00:00.000000
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'b5d2f8e4a613'
+down_revision = 'a3e8c6d1f907'
+branch_labels = None
+depends_on = None
+
+ROLLUPS = {
+    'hostRollupsHourly': "substr(poll_time, 1, 13) || ':00:00'",
+    'hostRollupsDaily': "substr(poll_time, 1, 10) || ' 00:00:00'"
+}
+
+
+def upgrade():
+    for table, period_start in ROLLUPS.items():
+        with op.batch_alter_table(table) as batch_op:
+            batch_op.add_column(sa.Column('seconds', sa.Integer(), nullable=False, server_default='0'))
+            batch_op.add_column(sa.Column('up_seconds', sa.Integer(), nullable=False, server_default='0'))
+        # Each poll accounts for the time since the host's previous poll; archived days stay at 0
+        op.execute(
+            'UPDATE "{table}" SET seconds = polled.seconds, up_seconds = polled.up_seconds FROM ('
+            'SELECT host_id, {period_start} AS period_start, coalesce(sum(gap), 0) AS seconds, '
+            'coalesce(sum(CASE WHEN poll_status = \'Up\' THEN gap END), 0) AS up_seconds FROM ('
+            'SELECT host_id, poll_time, poll_status, CAST(round((julianday(poll_time) - julianday('
+            'lag(poll_time) OVER (PARTITION BY host_id ORDER BY poll_time))) * 86400) AS INTEGER) AS gap '
+            'FROM "pollHistory" WHERE host_id IS NOT NULL AND poll_time IS NOT NULL'
+            ') GROUP BY host_id, {period_start}'
+            ') AS polled WHERE "{table}".host_id = polled.host_id AND "{table}".period_start = polled.period_start'
+            .format(table=table, period_start=period_start)
+        )
+
+
+def downgrade():
+    for table in ROLLUPS:
+        with op.batch_alter_table(table) as batch_op:
+            batch_op.drop_column('up_seconds')
+            batch_op.drop_column('seconds')
@@ -0,0 +1,35 @@
+"""Index history timestamps used by retention and add retention run log
+Revision ID: c3b8d1f6e924
+Revises: a61e4c8f2b57
+Create Date: 2026-10-18 09:10:00.000000
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c3b8d1f6e924'
+down_revision = 'a61e4c8f2b57'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_index('ix_pollHistory_date_created', 'pollHistory', ['date_created'])
+    op.create_index('ix_hostStatusIntervals_end_time', 'hostStatusIntervals', ['end_time'])
+    op.create_table(
+        'retentionRuns',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('run_time', sa.String(length=20), nullable=True),
+        sa.Column('cutoff', sa.String(length=20), nullable=True),
+        sa.Column('rows_deleted', sa.Integer(), nullable=False),
+        sa.Column('chunks', sa.Integer(), nullable=False),
+        sa.Column('seconds', sa.Float(), nullable=False),
+        sa.PrimaryKeyConstraint('id')
+    )
+
+
+def downgrade():
+    op.drop_table('retentionRuns')
+    op.drop_index('ix_hostStatusIntervals_end_time', table_name='hostStatusIntervals')
+    op.drop_index('ix_pollHistory_date_created', table_name='pollHistory')
@@ -0,0 +1,27 @@
+"""Add deleted hosts table so reused host ids do not inherit archived history
+Revision ID: c8a4e1f5b372
+Revises: b5d2f8e4a613
+Create Date: 2026-10-18 14:00:00.000000
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c8a4e1f5b372'
+down_revision = 'b5d2f8e4a613'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        'deletedHosts',
+        sa.Column('host_id', sa.Integer(), autoincrement=False, nullable=False),
+        sa.Column('deleted_on', sa.Date(), nullable=False),
+        sa.PrimaryKeyConstraint('host_id')
+    )
+
+
+def downgrade():
+    op.drop_table('deletedHosts')
@@ -0,0 +1,58 @@
+"""Store host status interval bounds as DATETIME like the other poll timestamps
+Revision ID: d2b7f4c9e835
+Revises: c8a4e1f5b372
+Create Date: 2026-10-18 15:00:00.000000
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'd2b7f4c9e835'
+down_revision = 'c8a4e1f5b372'
+branch_labels = None
+depends_on = None
+
+TIMESTAMP_COLUMNS = ['start_time', 'end_time']
+
+BACKFILL_CHUNK = 50000
+
+
+def _backfill(suffix, length):
+    '''Rewrite text bounds in id ranges, committing each range so the writer keeps writing'''
+    bind = op.get_bind()
+    max_id = bind.execute(sa.text('SELECT max(id) FROM "hostStatusIntervals"')).scalar() or 0
+    for low in range(0, max_id + 1, BACKFILL_CHUNK):
+        with op.get_context().autocommit_block():
+            for column in TIMESTAMP_COLUMNS:
+                bind.execute(sa.text(
+                    'UPDATE "hostStatusIntervals" SET {column} = {column} || :suffix '
+                    'WHERE id >= :low AND id < :high AND length({column}) = :length'.format(column=column)
+                ), {'suffix': suffix, 'low': low, 'high': low + BACKFILL_CHUNK, 'length': length})
+
+
+def upgrade():
+    if op.get_bind().dialect.name == 'sqlite':
+        # Same approach as e7a2c9b4d058: SQLite only needs the values in SQLAlchemy's DATETIME format
+        _backfill('.000000', 19)
+    else:
+        for column in TIMESTAMP_COLUMNS:
+            op.alter_column(
+                'hostStatusIntervals', column,
+                existing_type=sa.String(length=20),
+                type_=sa.DateTime(),
+                postgresql_using='{}::timestamp without time zone'.format(column)
+            )
+
+
+def downgrade():
+    if op.get_bind().dialect.name == 'sqlite':
+        for column in TIMESTAMP_COLUMNS:
+            op.execute(
+                'UPDATE "hostStatusIntervals" SET {column} = substr({column}, 1, 19) WHERE length({column}) = 26'.format(
+                    column=column
+                )
+            )
+    else:
+        for column in TIMESTAMP_COLUMNS:
+            op.alter_column('hostStatusIntervals', column, existing_type=sa.DateTime(), type_=sa.String(length=20))
@@ -0,0 +1,78 @@
+"""Store poll timestamps as DATETIME and index the hot history, alert and host queries
+Revision ID: e7a2c9b4d058
+Revises: c3b8d1f6e924
+Create Date: 2026-10-18 09:20:00.000000
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e7a2c9b4d058'
+down_revision = 'c3b8d1f6e924'
+branch_labels = None
+depends_on = None
+
+TIMESTAMP_COLUMNS = [
+    ('pollHistory', 'poll_time'),
+    ('hostAlerts', 'poll_time'),
+    ('hosts', 'last_poll')
+]
+
+INDEXES = [
+    ('ix_pollHistory_host_id_poll_time', 'pollHistory', ['host_id', 'poll_time']),
+    ('ix_hostAlerts_alert_cleared_host_id', 'hostAlerts', ['alert_cleared', 'host_id']),
+    ('ix_hostAlerts_host_id_poll_time', 'hostAlerts', ['host_id', 'poll_time']),
+    ('ix_hosts_status', 'hosts', ['status'])
+]
+
+BACKFILL_CHUNK = 50000
+
+
+def _backfill(table, column, suffix, length):
+    """Rewrite text timestamps in id ranges, committing each range so pollers keep writing
+
+    SQLAlchemy stores SQLite DATETIME values as 'YYYY-MM-DD HH:MM:SS.ffffff'; the old String(20)
+    values lack the microseconds and would compare wrong against new rows.
+    """
+    bind = op.get_bind()
+    max_id = bind.execute(sa.text('SELECT max(id) FROM "{}"'.format(table))).scalar() or 0
+    for low in range(0, max_id + 1, BACKFILL_CHUNK):
+        with op.get_context().autocommit_block():
+            bind.execute(sa.text(
+                'UPDATE "{table}" SET {column} = {column} || :suffix '
+                'WHERE id >= :low AND id < :high AND length({column}) = :length'.format(table=table, column=column)
+            ), {'suffix': suffix, 'low': low, 'high': low + BACKFILL_CHUNK, 'length': length})
+
+
+def upgrade():
+    if op.get_bind().dialect.name == 'sqlite':
+        # SQLite keeps both declared types as text, so only the values need normalizing; skipping
+        # ALTER avoids the batch-mode table copy that would lock the whole table
+        for table, column in TIMESTAMP_COLUMNS:
+            _backfill(table, column, '.000000', 19)
+    else:
+        for table, column in TIMESTAMP_COLUMNS:
+            op.alter_column(
+                table, column,
+                existing_type=sa.String(length=20),
+                type_=sa.DateTime(),
+                postgresql_using='{}::timestamp without time zone'.format(column)
+            )
+
+    for name, table, columns in INDEXES:
+        op.create_index(name, table, columns)
+
+
+def downgrade():
+    for name, table, columns in INDEXES:
+        op.drop_index(name, table_name=table)
+
+    if op.get_bind().dialect.name == 'sqlite':
+        for table, column in TIMESTAMP_COLUMNS:
+            op.execute('UPDATE "{table}" SET {column} = substr({column}, 1, 19) WHERE length({column}) = 26'.format(
+                table=table, column=column
+            ))
+    else:
+        for table, column in TIMESTAMP_COLUMNS:
+            op.alter_column(table, column, existing_type=sa.DateTime(), type_=sa.String(length=20))
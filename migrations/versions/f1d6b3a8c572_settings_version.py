@@ -0,0 +1,28 @@
+"""Add settings version stamp used to invalidate per-process settings caches
+Revision ID: f1d6b3a8c572
+Revises: e7a2c9b4d058
+Create Date: 2026-10-18 09:40:00.000000
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'f1d6b3a8c572'
+down_revision = 'e7a2c9b4d058'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    settings_version = op.create_table(
+        'settingsVersion',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('version', sa.Integer(), nullable=False),
+        sa.PrimaryKeyConstraint('id')
+    )
+    op.bulk_insert(settings_version, [{'id': 1, 'version': 0}])
+
+
+def downgrade():
+    op.drop_table('settingsVersion')
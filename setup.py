@@ -19,6 +19,9 @@ setuptools.setup(
     packages=setuptools.find_packages(),
     install_requires=install_requires,
     python_requires='>=3.9',
+    entry_points={
+        'console_scripts': ['ipmon-poller=ipmon.poller:main']
+    },
     classifiers=[
         "Programming Language :: Python :: 3",
         "License :: OSI Approved :: MIT License",
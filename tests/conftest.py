@@ -0,0 +1,28 @@
+'''Fixtures compartidos de las pruebas'''
+import os
+import sys
+import pytest
+
+from flask import Flask
+
+sys.path.append(os.path.dirname(os.path.realpath(__file__)) + '/../')
+from ipmon import db, config
+
+
+@pytest.fixture
+def app_db(tmp_path, monkeypatch):
+    '''App context sobre una base SQLite y un directorio de archivo vacíos en `tmp_path`'''
+    test_app = Flask('ipmon-tests')
+    test_app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///{}'.format(tmp_path / 'ipmon.db')
+    db.init_app(test_app)
+
+    archive = tmp_path / 'archive'
+    archive.mkdir()
+    monkeypatch.setitem(config['Archive'], 'Path', str(archive))
+    monkeypatch.setitem(config['Archive'], 'Enabled', True)
+    monkeypatch.setitem(config, 'History_Mode', 'polls')
+
+    with test_app.app_context():
+        db.create_all()
+        yield db
+        db.session.remove()
@@ -0,0 +1,70 @@
+'''Pruebas del archivo columnar del historial'''
+import os
+import sys
+
+from datetime import date, datetime, timedelta
+
+sys.path.append(os.path.dirname(os.path.realpath(__file__)) + '/../')
+from ipmon import db
+from ipmon.archive import _DayWriter, ArchiveDay, archive_day, archive_path, archived_days, read_host_history
+from ipmon.database import PollHistory
+
+DAY = date(2026, 1, 1)
+
+
+def _write(path, rows, chunk_rows):
+    with open(path, 'wb') as file:
+        writer = _DayWriter(file, chunk_rows, 6)
+        for row in rows:
+            writer.add(*row)
+        writer.close()
+
+
+def test_round_trip_across_chunks(tmp_path):
+    # host_id, offset, status, rtt_min_us, rtt_avg_us, rtt_max_us, jitter_us, loss_pct
+    rows = [(1, i * 60, i % 2, 900 + i, 1000 + i, 1100 + i, 50, 0) for i in range(7)]
+    rows += [(2, 30, 0, None, None, None, None, 100)]
+    rows += [(5, i * 3600, 1, 2000, 2500, 3000, None, 20) for i in range(5)]
+    path = str(tmp_path / 'day.ipa')
+    # 3 rows per chunk, so hosts 1 and 5 span several chunks
+    _write(path, rows, chunk_rows=3)
+
+    with ArchiveDay(path, DAY) as archive:
+        assert archive.rows == len(rows)
+        for host_id in (1, 2, 5):
+            expected = [row for row in rows if row[0] == host_id]
+            read = archive.read_host(host_id)
+            assert [
+                (
+                    row['host_id'],
+                    int((datetime.strptime(row['poll_time'], '%Y-%m-%d %H:%M:%S') - datetime(2026, 1, 1)).total_seconds()),
+                    1 if row['poll_status'] == 'Up' else 0,
+                    row['rtt_min_us'], row['rtt_avg_us'], row['rtt_max_us'], row['jitter_us'], row['loss_pct']
+                )
+                for row in read
+            ] == expected
+            assert all(row['date_created'] == '2026-01-01' for row in read)
+        assert archive.read_host(3) == []
+        assert archive.read_host(6) == []
+
+
+def test_archive_day_reads_back_the_database_rows(app_db):
+    polls = [
+        PollHistory(host_id=host_id, poll_time=datetime(2026, 1, 1) + timedelta(minutes=minute),
+                    poll_status='Up' if minute % 3 else 'Down', rtt_avg_us=minute * 10 or None, loss_pct=0)
+        for host_id in (1, 2) for minute in range(0, 1440, 90)
+    ]
+    # Outside the archived day
+    polls.append(PollHistory(host_id=1, poll_time=datetime(2026, 1, 2), poll_status='Up'))
+    db.session.add_all(polls)
+    db.session.commit()
+
+    archive_day(db.session, DAY)
+    assert archived_days() == (DAY,)
+    assert os.path.exists(archive_path(DAY))
+
+    read = read_host_history(1)
+    assert [(row['poll_time'], row['poll_status'], row['rtt_avg_us']) for row in read] == [
+        (poll.poll_time.strftime('%Y-%m-%d %H:%M:%S'), poll.poll_status, poll.rtt_avg_us)
+        for poll in polls if poll.host_id == 1 and poll.poll_time.date() == DAY
+    ]
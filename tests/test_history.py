@@ -0,0 +1,80 @@
+'''Pruebas de la paginación del historial entre la base de datos y el archivo'''
+import os
+import sys
+import json
+
+from datetime import date, datetime, timedelta
+
+sys.path.append(os.path.dirname(os.path.realpath(__file__)) + '/../')
+from ipmon import db
+from ipmon.archive import archive_day
+from ipmon.database import PollHistory, DeletedHosts
+from ipmon.history import get_host_history
+from ipmon.serialize import dumps
+
+ARCHIVED = date(2026, 1, 1)
+
+
+def _add_polls(host_id, start, hours):
+    polls = [
+        PollHistory(host_id=host_id, poll_time=start + timedelta(hours=hour), poll_status='Up' if hour % 5 else 'Down')
+        for hour in range(hours)
+    ]
+    db.session.add_all(polls)
+    db.session.commit()
+    return [poll.poll_time.strftime('%Y-%m-%d %H:%M:%S') for poll in polls]
+
+
+def _pages(host_id, limit, **kwargs):
+    '''Recorre las páginas como un cliente de /pollHistory: JSON y el cursor de vuelta como texto'''
+    poll_times = []
+    cursor = None
+    while True:
+        history, cursor = get_host_history(host_id, before=cursor, limit=limit, **kwargs)
+        page = json.loads(dumps({'next_cursor': cursor, 'data': history}))
+        assert len(page['data']) <= limit
+        poll_times.extend(row['poll_time'] for row in page['data'])
+        if page['next_cursor'] is None:
+            return poll_times
+        cursor = datetime.fromisoformat(page['next_cursor'])
+
+
+def test_pages_cross_from_database_into_archive(app_db):
+    archived = _add_polls(1, datetime(2026, 1, 1), 24)
+    live = _add_polls(1, datetime(2026, 1, 2), 24)
+    _add_polls(2, datetime(2026, 1, 1), 48)
+    # Archived rows stay in the database until retention deletes them; they must not show up twice
+    archive_day(db.session, ARCHIVED)
+
+    expected = list(reversed(archived + live))
+    # 7 does not divide 24, so a page straddles the boundary
+    assert _pages(1, 7) == expected
+    assert _pages(1, 1000) == expected
+
+
+def test_pages_respect_range_across_the_boundary(app_db):
+    archived = _add_polls(1, datetime(2026, 1, 1), 24)
+    live = _add_polls(1, datetime(2026, 1, 2), 24)
+    archive_day(db.session, ARCHIVED)
+    PollHistory.query.filter(PollHistory.poll_time < datetime(2026, 1, 2)).delete()
+    db.session.commit()
+
+    start, end = datetime(2026, 1, 1, 20), datetime(2026, 1, 2, 3)
+    expected = [
+        poll_time for poll_time in reversed(archived + live)
+        if start <= datetime.fromisoformat(poll_time) <= end
+    ]
+    assert len(expected) == 8
+    assert _pages(1, 5, start=start, end=end) == expected
+
+
+def test_archived_days_before_a_host_was_deleted_are_skipped(app_db):
+    _add_polls(1, datetime(2026, 1, 1), 24)
+    archive_day(db.session, ARCHIVED)
+    PollHistory.query.delete()
+    # Host 1 was deleted on Jan 2 and the id went to a new host
+    db.session.add(DeletedHosts(host_id=1, deleted_on=date(2026, 1, 2)))
+    db.session.commit()
+    live = _add_polls(1, datetime(2026, 1, 2), 3)
+
+    assert _pages(1, 2) == list(reversed(live))
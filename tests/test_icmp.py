@@ -0,0 +1,60 @@
+'''Pruebas del estimador de RTT (RFC 6298) y jitter (RFC 3550)'''
+import os
+import sys
+import pytest
+
+sys.path.append(os.path.dirname(os.path.realpath(__file__)) + '/../')
+from ipmon.icmp import RttEstimator
+
+
+def test_timeout_is_max_without_samples():
+    estimator = RttEstimator(min_timeout=0.2, max_timeout=1.0)
+    assert estimator.timeout('10.0.0.1') == 1.0
+
+
+def test_first_sample_seeds_rttvar_with_half_rtt():
+    estimator = RttEstimator(min_timeout=0.01, max_timeout=5.0)
+    estimator.update('10.0.0.1', 100.0)
+    # RTO = SRTT + 4 * RTTVAR = 100 + 4 * 50 ms
+    assert estimator.timeout('10.0.0.1') == pytest.approx(0.3)
+
+
+def test_following_samples_use_rfc6298_gains():
+    estimator = RttEstimator(min_timeout=0.01, max_timeout=5.0)
+    estimator.update('10.0.0.1', 100.0)
+    estimator.update('10.0.0.1', 200.0)
+    # RTTVAR = 3/4 * 50 + 1/4 * |100 - 200| = 62.5; SRTT = 7/8 * 100 + 1/8 * 200 = 112.5
+    assert estimator.timeout('10.0.0.1') == pytest.approx((112.5 + 4 * 62.5) / 1000)
+
+    estimator.update('10.0.0.1', 112.5)
+    # RTTVAR uses the SRTT from before this sample
+    rttvar = 0.75 * 62.5
+    assert estimator.timeout('10.0.0.1') == pytest.approx((112.5 + 4 * rttvar) / 1000)
+
+
+def test_timeout_is_clamped():
+    estimator = RttEstimator(min_timeout=0.2, max_timeout=1.0)
+    estimator.update('fast', 1.0)
+    estimator.update('slow', 900.0)
+    assert estimator.timeout('fast') == 0.2
+    assert estimator.timeout('slow') == 1.0
+
+
+def test_hosts_are_independent_and_missing_rtt_is_ignored():
+    estimator = RttEstimator(min_timeout=0.01, max_timeout=5.0)
+    estimator.update('10.0.0.1', 100.0)
+    estimator.update('10.0.0.1', None)
+    assert estimator.timeout('10.0.0.1') == pytest.approx(0.3)
+    assert estimator.timeout('10.0.0.2') == 5.0
+
+
+def test_jitter_needs_two_samples_then_smooths_by_sixteenths():
+    estimator = RttEstimator()
+    estimator.update('10.0.0.1', 10.0)
+    assert estimator.jitter('10.0.0.1') is None
+
+    estimator.update('10.0.0.1', 14.0)
+    assert estimator.jitter('10.0.0.1') == pytest.approx(4.0)
+
+    estimator.update('10.0.0.1', 14.0)
+    assert estimator.jitter('10.0.0.1') == pytest.approx(4.0 + (0.0 - 4.0) / 16)
@@ -0,0 +1,29 @@
+'''Pruebas de los tokens del canal push'''
+import os
+import sys
+import time
+
+sys.path.append(os.path.dirname(os.path.realpath(__file__)) + '/../')
+from ipmon.push import issue_token, valid_token
+
+
+def test_token_is_valid_until_max_age(monkeypatch):
+    token = issue_token('1')
+    issued = time.time()
+    assert valid_token(token, max_age=60)
+
+    monkeypatch.setattr(time, 'time', lambda: issued + 59)
+    assert valid_token(token, max_age=60)
+
+    monkeypatch.setattr(time, 'time', lambda: issued + 120)
+    assert not valid_token(token, max_age=60)
+
+
+def test_missing_or_tampered_tokens_are_rejected():
+    token = issue_token('1')
+    assert not valid_token(None, max_age=60)
+    assert not valid_token('', max_age=60)
+    # Another user's payload under this token's timestamp and signature
+    forged = '.'.join([issue_token('2').split('.')[0]] + token.split('.')[1:])
+    assert not valid_token(forged, max_age=60)
+    assert not valid_token('not-a-token', max_age=60)
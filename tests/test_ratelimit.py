@@ -0,0 +1,73 @@
+'''Pruebas del token bucket de sondas'''
+import os
+import sys
+import asyncio
+import pytest
+
+from types import SimpleNamespace
+
+sys.path.append(os.path.dirname(os.path.realpath(__file__)) + '/../')
+from ipmon import ratelimit
+from ipmon.ratelimit import TokenBucket
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    '''Reloj simulado: asyncio.sleep avanza el tiempo sin esperar y guarda cada espera'''
+    state = SimpleNamespace(now=1000.0, sleeps=[])
+
+    async def sleep(seconds):
+        state.sleeps.append(seconds)
+        state.now += seconds
+
+    monkeypatch.setattr(ratelimit, 'time', SimpleNamespace(monotonic=lambda: state.now))
+    monkeypatch.setattr(ratelimit, 'asyncio', SimpleNamespace(sleep=sleep))
+    return state
+
+
+def _acquire(bucket, times):
+    async def run():
+        for dummy in range(times):
+            await bucket.acquire()
+    asyncio.run(run())
+
+
+def test_burst_then_rate(clock):
+    bucket = TokenBucket(rate=100, burst=5)
+    _acquire(bucket, 5)
+    assert clock.sleeps == []
+
+    _acquire(bucket, 2)
+    assert clock.sleeps == [pytest.approx(0.01), pytest.approx(0.01)]
+
+
+def test_refill_is_capped_at_burst(clock):
+    bucket = TokenBucket(rate=10, burst=3)
+    _acquire(bucket, 3)
+
+    # Half a second refills 5 tokens at 10/s, but only 3 fit in the bucket
+    clock.now += 0.5
+    _acquire(bucket, 3)
+    assert clock.sleeps == []
+    _acquire(bucket, 1)
+    assert clock.sleeps == [pytest.approx(0.1)]
+
+
+def test_partial_refill(clock):
+    bucket = TokenBucket(rate=10, burst=1)
+    _acquire(bucket, 1)
+
+    clock.now += 0.04
+    _acquire(bucket, 1)
+    assert clock.sleeps == [pytest.approx(0.06)]
+
+
+def test_zero_rate_disables_pacing(clock):
+    bucket = TokenBucket(rate=0)
+    _acquire(bucket, 1000)
+    assert clock.sleeps == []
+
+
+def test_default_burst_is_a_twentieth_of_a_second():
+    assert TokenBucket(rate=1000).burst == 50
+    assert TokenBucket(rate=5).burst == 1
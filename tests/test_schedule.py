@@ -0,0 +1,52 @@
+'''Pruebas de la planificación adaptativa del sondeo'''
+import os
+import sys
+
+sys.path.append(os.path.dirname(os.path.realpath(__file__)) + '/../')
+from ipmon.schedule import PollSchedule
+
+
+def test_new_hosts_are_due_immediately_and_deleted_ones_forgotten():
+    schedule = PollSchedule(base_interval=60)
+    schedule.sync([1, 2, 3], now=0)
+    assert sorted(schedule.pop_due(0)) == [1, 2, 3]
+
+    schedule.sync([1, 2], now=0)
+    assert sorted(schedule.pop_due(60)) == [1, 2]
+
+
+def test_down_and_changed_hosts_use_the_min_interval():
+    schedule = PollSchedule(base_interval=60, min_interval=10)
+    schedule.sync([1, 2, 3], now=0)
+    schedule.pop_due(0)
+    schedule.record(1, 'Down', False, now=0)
+    schedule.record(2, 'Up', True, now=0)
+    schedule.record(3, 'Up', False, now=0)
+
+    assert sorted(schedule.pop_due(10)) == [1, 2]
+    assert schedule.pop_due(59) == []
+    assert schedule.pop_due(60) == [3]
+
+
+def test_stable_hosts_back_off_up_to_max():
+    schedule = PollSchedule(base_interval=60, max_backoff=4, stable_polls=2)
+    intervals = [schedule.next_interval('Up', False, stable) for stable in range(8)]
+    assert intervals == [60, 60, 120, 120, 240, 240, 240, 240]
+
+
+def test_non_adaptive_schedule_uses_the_base_interval():
+    schedule = PollSchedule(base_interval=60, adaptive=False)
+    assert schedule.next_interval('Down', True, 0) == 60
+    assert schedule.next_interval('Up', False, 100) == 60
+
+
+def test_reschedule_supersedes_the_placeholder():
+    schedule = PollSchedule(base_interval=60, min_interval=10)
+    schedule.sync([1], now=0)
+    schedule.pop_due(0)
+    schedule.record(1, 'Down', False, now=0)
+    assert schedule.pop_due(10) == [1]
+    # The placeholder pushed at t=0 for t=60 must not fire again
+    schedule.record(1, 'Up', False, now=10)
+    assert schedule.pop_due(60) == []
+    assert schedule.pop_due(70) == [1]